@@ -6,6 +6,10 @@ import re
 from collections import Counter
 from pathlib import Path
 
+from corpus import (
+    has_corpus, iter_corpus_records, open_text, resolve_jsonl,
+)
+
 # ══════════════════════════════════════════════
 # PHASE 1 : CHARGEMENT ROBUSTE
 # ══════════════════════════════════════════════
@@ -14,18 +18,27 @@ filepath = Path('JSONL\darkgram_cti_final.jsonl')
 data = []
 errors = 0
 
+# Colonnes lues si le corpus Parquet existe (pas de json.loads)
+CORPUS_COLUMNS = [
+    'text', 'category', 'channel id', 'channel_id', 'channel_name',
+    'date', 'views', 'forwards', 'recovered', 'parent_post_id',
+]
+
 print("🔍 Chargement du fichier JSONL...")
 try:
-    with open(filepath, 'r', encoding='utf-8') as f:
-        for i, line in enumerate(f):
-            try:
-                obj = json.loads(line.strip())
-                if 'text' in obj:  # Validation minimale
-                    data.append(obj)
-                else:
+    if has_corpus(filepath):
+        data = list(iter_corpus_records(filepath, columns=CORPUS_COLUMNS))
+    else:
+        with open_text(resolve_jsonl(filepath)) as f:
+            for i, line in enumerate(f):
+                try:
+                    obj = json.loads(line.strip())
+                    if 'text' in obj:  # Validation minimale
+                        data.append(obj)
+                    else:
+                        errors += 1
+                except json.JSONDecodeError:
                     errors += 1
-            except json.JSONDecodeError:
-                errors += 1
     print(f"✅ {len(data)} documents chargés. {errors} lignes ignorées.")
 except FileNotFoundError:
     print(f"❌ Fichier introuvable : {filepath}")
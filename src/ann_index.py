@@ -0,0 +1,103 @@
+# ann_index.py
+"""
+Index FAISS approchés (ANN) : HNSW, IVF-Flat, IVF-PQ.
+
+Les vecteurs sont d'abord indexés en flat (exact) pendant la
+construction en flux, puis convertis : entraînement (IVF) sur un
+échantillon, ajout dans le même ordre (les positions de
+index_to_docstore_id restent valides). Métrique L2, comme l'index
+flat de LangChain : les scores et RELEVANCE_THRESHOLD ne changent pas.
+"""
+
+import math
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ('flat', 'hnsw', 'ivf-flat', 'ivf-pq')
+
+HNSW_M = 32                 # voisins par nœud
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 128        # ↑ rappel, ↓ QPS
+IVF_NPROBE = 16             # listes visitées par requête
+PQ_M = 48                   # sous-vecteurs (768 / 48 = 16 dims)
+PQ_NBITS = 8
+TRAIN_SAMPLE = 100_000      # vecteurs max pour l'entraînement IVF
+SEED = 42
+
+# Chargement en lecture seule mappé en mémoire : les vecteurs
+# restent dans le page cache, partagé entre processus.
+# IO_FLAG_MMAP_IFC (faiss ≥ 1.10) couvre flat, HNSW et IVF-Flat.
+MMAP_IO_FLAGS = (
+    getattr(faiss, 'IO_FLAG_MMAP_IFC', faiss.IO_FLAG_MMAP)
+    | faiss.IO_FLAG_READ_ONLY
+)
+
+
+def ivf_nlist(n_vectors):
+    """~4·√n listes, avec ≥ 39 vecteurs d'entraînement par liste."""
+    return max(1, min(int(4 * math.sqrt(n_vectors)), n_vectors // 39))
+
+
+def index_type_of(index):
+    if isinstance(index, faiss.IndexHNSW):
+        return 'hnsw'
+    if isinstance(index, faiss.IndexIVFPQ):
+        return 'ivf-pq'
+    if isinstance(index, faiss.IndexIVF):
+        return 'ivf-flat'
+    return 'flat'
+
+
+def tune_index(index, nprobe=IVF_NPROBE, ef_search=HNSW_EF_SEARCH):
+    """Paramètres de recherche (sans reconstruire l'index)."""
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search
+    elif isinstance(index, faiss.IndexIVF):
+        index.nprobe = nprobe
+    return index
+
+
+def build_ann_index(vectors, index_type,
+                    nprobe=IVF_NPROBE, ef_search=HNSW_EF_SEARCH):
+    """Index `index_type` sur `vectors` (float32, n × d), entraîné."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+
+    if index_type == 'flat':
+        index = faiss.IndexFlatL2(dim)
+    elif index_type == 'hnsw':
+        index = faiss.IndexHNSWFlat(dim, HNSW_M)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    elif index_type in ('ivf-flat', 'ivf-pq'):
+        nlist = ivf_nlist(n)
+        quantizer = faiss.IndexFlatL2(dim)
+        if index_type == 'ivf-flat':
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+        else:
+            # PQ_M doit diviser la dimension
+            pq_m = next(
+                m for m in range(min(PQ_M, dim), 0, -1) if dim % m == 0
+            )
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, PQ_NBITS)
+
+        sample = vectors
+        if n > TRAIN_SAMPLE:
+            rng = np.random.default_rng(SEED)
+            rows = rng.choice(n, TRAIN_SAMPLE, replace=False)
+            sample = vectors[np.sort(rows)]
+        index.train(sample)
+    else:
+        raise ValueError(
+            f"Type d'index inconnu : {index_type} (attendu : {INDEX_TYPES})"
+        )
+
+    index.add(vectors)
+    return tune_index(index, nprobe=nprobe, ef_search=ef_search)
+
+
+def index_vectors(index):
+    """Vecteurs stockés (exacts pour flat / HNSW / IVF-Flat)."""
+    if isinstance(index, faiss.IndexIVF):
+        index.make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
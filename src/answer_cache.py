@@ -0,0 +1,89 @@
+# answer_cache.py
+"""
+Cache sémantique des réponses de CTIAgent.analyze : une question
+à moins de ANSWER_MAX_DISTANCE (distance cosinus) d'une question
+déjà traitée reçoit la même réponse et les mêmes sources, sans
+passer par Phi-3.5 (reformulation + analyse).
+
+Chaque entrée porte la version de l'index qui l'a produite
+(build id relu sur disque par l'agent) : après reconstruction /
+mise à jour de faiss_cti_index, par ce processus ou un autre, les
+entrées de l'ancienne version ne sont plus servies. LRU borné,
+durée de vie ANSWER_CACHE_TTL.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+ANSWER_CACHE_SIZE = 256      # réponses gardées (LRU) ; 0 = désactivé
+ANSWER_CACHE_TTL = 3600      # secondes
+ANSWER_MAX_DISTANCE = 0.05   # 1 - cosinus entre les questions
+
+
+class AnswerCache:
+    """Question (vecteur) + version d'index → résultat d'analyze."""
+
+    def __init__(self, size=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL,
+                 max_distance=ANSWER_MAX_DISTANCE):
+        self.size = size
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # n° → (vecteur, version, t, résultat)
+        self._next_key = 0
+
+    def _expire(self, version):
+        """Retire les entrées périmées ou d'une autre version d'index."""
+        now = time.monotonic()
+        stale = [
+            key for key, (_, entry_version, created, _) in self._entries.items()
+            if entry_version != version or now - created > self.ttl
+        ]
+        for key in stale:
+            del self._entries[key]
+
+    def get(self, vector, version):
+        """Résultat de la question la plus proche, ou None."""
+        if not self.size:
+            return None
+        vector = np.array(vector, dtype=np.float32)
+        vector /= np.linalg.norm(vector)
+
+        with self._lock:
+            self._expire(version)
+            if not self._entries:
+                self.misses += 1
+                return None
+            keys = list(self._entries)
+            vectors = np.stack([self._entries[key][0] for key in keys])
+            distances = 1 - vectors @ vector
+            best = int(np.argmin(distances))
+            if distances[best] > self.max_distance:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(keys[best])
+            return self._entries[keys[best]][3]
+
+    def put(self, vector, version, result):
+        if not self.size:
+            return
+        vector = np.array(vector, dtype=np.float32)
+        vector /= np.linalg.norm(vector)
+
+        with self._lock:
+            self._entries[self._next_key] = (
+                vector, version, time.monotonic(), result,
+            )
+            self._next_key += 1
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def print_stats(self):
+        print(f"  ♻️  Réponses : {self.hits} en cache, "
+              f"{self.misses} générées ({len(self._entries)} gardées)")
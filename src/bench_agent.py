@@ -0,0 +1,68 @@
+# bench_agent.py
+"""
+Latence par question : CTIAgent.analyze (séquentiel) vs aanalyze
+(recherche sur la question originale pendant la reformulation).
+Cache de réponses désactivé pour que chaque appel passe par le LLM,
+LRU des requêtes vidé avant chaque appel mesuré, ordre alterné
+d'une question à l'autre : aucun des deux chemins ne profite du
+chauffage de l'autre (embeddings, cache de prompt d'Ollama).
+Mêmes sources attendues quand la reformulation est identique
+(temperature 0.1 : elle peut varier d'un appel à l'autre).
+"""
+import asyncio
+import time
+
+import numpy as np
+
+from answer_cache import AnswerCache
+from create_index import get_embedding_model, load_index
+from embedding_cache import QueryCachedEmbeddings
+from embedding_pool import BucketedEmbeddings
+from eval_questions import RETRIEVAL_QUESTIONS
+from rag_chain import CTIAgent
+
+
+async def main():
+    # Cache de requêtes non persisté : remplacé à chaque appel
+    model = BucketedEmbeddings(get_embedding_model())
+    agent = CTIAgent(load_index(QueryCachedEmbeddings(model), mmap=True))
+    agent.answer_cache = AnswerCache(size=0)
+    agent.analyze("warm-up cracking tools shared", verbose=False)
+
+    async def run_analyze(question):
+        return agent.analyze(question, verbose=False)
+
+    async def run_aanalyze(question):
+        return await agent.aanalyze(question, verbose=False)
+
+    runs = [('analyze', run_analyze), ('aanalyze', run_aanalyze)]
+    timings = {name: [] for name, _ in runs}
+    compared = same = 0
+    for i, question in enumerate(RETRIEVAL_QUESTIONS):
+        results = {}
+        for name, run in (runs if i % 2 == 0 else runs[::-1]):
+            # Question jamais embeddée pour ce chemin
+            agent.vectorstore.embedding_function = QueryCachedEmbeddings(
+                model
+            )
+            t0 = time.perf_counter()
+            results[name] = await run(question)
+            timings[name].append(time.perf_counter() - t0)
+
+        sync_result, async_result = results['analyze'], results['aanalyze']
+        if sync_result["rewritten"] == async_result["rewritten"]:
+            compared += 1
+            same += sync_result["sources"] == async_result["sources"]
+
+    print("═" * 60)
+    print(f"  AGENT : analyze vs aanalyze ({len(RETRIEVAL_QUESTIONS)} questions)")
+    print("═" * 60)
+    for name, values in timings.items():
+        p50, p95 = np.percentile(values, [50, 95])
+        print(f"  {name:9s} : p50 {p50:6.2f} s | p95 {p95:6.2f} s")
+    print(f"  Sources identiques : {same}/{compared} "
+          f"(reformulations identiques)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+# bench_ann.py
+"""
+Benchmark des index ANN (HNSW, IVF-Flat, IVF-PQ) contre l'index
+flat exact : QPS, latence p50/p99 par requête et recall@k, sur
+les questions de test_scores.py et test_rag_final.py.
+Les vecteurs sont relus depuis l'index flat faiss_cti_index.
+"""
+import time
+
+import faiss
+import numpy as np
+
+from ann_index import (
+    build_ann_index, index_type_of, index_vectors, tune_index,
+)
+from create_index import load_index
+from eval_questions import RETRIEVAL_QUESTIONS
+
+TOP_K = 10
+REPEATS = 50    # passes sur les questions (mesure de latence)
+
+# (type, paramètre de recherche balayé, valeurs)
+CONFIGS = [
+    ('hnsw', 'ef_search', [16, 32, 64, 128, 256]),
+    ('ivf-flat', 'nprobe', [1, 4, 16, 64]),
+    ('ivf-pq', 'nprobe', [4, 16, 64]),
+]
+
+
+def measure(index, queries, k=TOP_K):
+    """(QPS, p50 ms, p99 ms, résultats) en requêtes unitaires."""
+    timings = []
+    for _ in range(REPEATS):
+        for query in queries:
+            t0 = time.perf_counter()
+            index.search(query[None, :], k)
+            timings.append(time.perf_counter() - t0)
+    _, found = index.search(queries, k)
+    timings = np.asarray(timings) * 1000
+    qps = len(timings) / (timings.sum() / 1000)
+    return qps, np.percentile(timings, 50), np.percentile(timings, 99), found
+
+
+def recall(found, expected, k=TOP_K):
+    return np.mean([
+        len(set(f) & set(e)) / k for f, e in zip(found, expected)
+    ])
+
+
+def report(label, qps, p50, p99, rec, build_s=None):
+    build = f" | build {build_s:6.1f} s" if build_s is not None else ""
+    print(f"  {label:22s} | {qps:8.0f} QPS | p50 {p50:6.3f} ms | "
+          f"p99 {p99:6.3f} ms | recall@{TOP_K} {rec:.3f}{build}")
+
+
+if __name__ == "__main__":
+    vectorstore = load_index()
+    if index_type_of(vectorstore.index) != 'flat':
+        raise SystemExit("Référence : faiss_cti_index doit être flat")
+
+    vectors = index_vectors(vectorstore.index)
+    queries = np.asarray(
+        vectorstore.embedding_function.embed_documents(RETRIEVAL_QUESTIONS),
+        dtype=np.float32,
+    )
+    faiss.omp_set_num_threads(1)   # latence mono-thread comparable
+
+    print("═" * 60)
+    print("  BENCHMARK index ANN")
+    print("═" * 60)
+    print(f"  {len(vectors)} vecteurs, {len(queries)} questions, "
+          f"{REPEATS} passes")
+
+    qps, p50, p99, expected = measure(vectorstore.index, queries)
+    report("flat (exact)", qps, p50, p99, 1.0)
+
+    for index_type, param, values in CONFIGS:
+        t0 = time.perf_counter()
+        index = build_ann_index(vectors, index_type)
+        build_s = time.perf_counter() - t0
+        for value in values:
+            tune_index(index, **{param: value})
+            qps, p50, p99, found = measure(index, queries)
+            report(f"{index_type} {param}={value}", qps, p50, p99,
+                   recall(found, expected), build_s)
+            build_s = None
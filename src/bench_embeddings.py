@@ -0,0 +1,95 @@
+# bench_embeddings.py
+"""
+Benchmark des lots d'embedding sur la distribution réelle des
+longueurs : lots par défaut (prepared batches → tri caractères
+de sentence-transformers) vs buckets par longueur en tokens.
+Rapporte docs/s et la part de tokens utiles dans les lots paddés.
+"""
+import random
+import time
+
+import numpy as np
+
+from create_index import get_embedding_model
+from embedding_pool import BucketedEmbeddings, length_buckets
+from load_documents import BATCH_SIZE, iter_prepared_batches
+from tokens import count_tokens
+
+N_SAMPLE = 5000
+SEED = 0
+
+
+def sample_chunks():
+    """Échantillon de chunks préparés, tiré sur tout le corpus."""
+    texts = [
+        doc.page_content
+        for batch in iter_prepared_batches()
+        for doc in batch
+    ]
+    rng = random.Random(SEED)
+    return rng.sample(texts, min(N_SAMPLE, len(texts)))
+
+
+def default_batches(texts, batch_size):
+    """Lots de SentenceTransformer.encode sur chaque lot préparé."""
+    batches = []
+    for start in range(0, len(texts), BATCH_SIZE):
+        part = np.arange(start, min(start + BATCH_SIZE, len(texts)))
+        order = part[np.argsort([-len(texts[i]) for i in part])]
+        batches.extend(
+            order[i:i + batch_size]
+            for i in range(0, len(order), batch_size)
+        )
+    return batches
+
+
+def padding_efficiency(counts, batches):
+    """Tokens réels / tokens paddés (1.0 = aucun padding)."""
+    real = sum(counts[i] for idx in batches for i in idx)
+    padded = sum(len(idx) * max(counts[i] for i in idx) for idx in batches)
+    return real / padded
+
+
+def throughput(embed, texts):
+    t0 = time.perf_counter()
+    for start in range(0, len(texts), BATCH_SIZE):
+        embed(texts[start:start + BATCH_SIZE])
+    return len(texts) / (time.perf_counter() - t0)
+
+
+if __name__ == "__main__":
+    texts = sample_chunks()
+    counts = count_tokens(texts)
+
+    model = get_embedding_model()
+    bucketed = BucketedEmbeddings(model)
+    batch_size = bucketed.batch_size
+
+    eff_default = padding_efficiency(
+        counts, default_batches(texts, batch_size)
+    )
+    eff_bucketed = padding_efficiency(
+        counts,
+        [
+            start + idx
+            for start in range(0, len(texts), BATCH_SIZE)
+            for idx in length_buckets(
+                texts[start:start + BATCH_SIZE], batch_size
+            )
+        ],
+    )
+
+    model.embed_documents(texts[:batch_size])  # warm-up
+    dps_default = throughput(model.embed_documents, texts)
+    dps_bucketed = throughput(bucketed.embed_documents, texts)
+
+    print("═" * 50)
+    print("  BENCHMARK lots d'embedding")
+    print("═" * 50)
+    print(f"  Chunks        : {len(texts)} "
+          f"(médiane {int(np.median(counts))}, max {max(counts)} tokens)")
+    print(f"  Par défaut    : {dps_default:.1f} docs/s, "
+          f"padding utile {eff_default:.0%}")
+    print(f"  Buckets       : {dps_bucketed:.1f} docs/s, "
+          f"padding utile {eff_bucketed:.0%}")
+    print(f"  Speedup       : x{dps_bucketed / dps_default:.2f}")
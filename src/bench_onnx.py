@@ -0,0 +1,78 @@
+# bench_onnx.py
+"""
+Benchmark des backends d'embedding (PyTorch, ONNX fp32, ONNX int8) :
+débit sur des chunks du corpus, latence d'une requête, et
+recall@10 sur les questions de test (référence : top-10 PyTorch,
+recherche exacte sur l'échantillon embeddé par chaque backend).
+"""
+import time
+
+import numpy as np
+
+from bench_embeddings import sample_chunks
+from create_index import get_embedding_model
+from embedding_pool import BucketedEmbeddings
+from eval_questions import RETRIEVAL_QUESTIONS
+
+BACKENDS = ['torch', 'onnx', 'onnx-int8']
+TOP_K = 10
+LATENCY_RUNS = 5   # passes sur les questions
+
+
+def top_k(doc_vectors, query_vectors, k=TOP_K):
+    scores = query_vectors @ doc_vectors.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def latencies_ms(model):
+    timings = []
+    for _ in range(LATENCY_RUNS):
+        for question in RETRIEVAL_QUESTIONS:
+            t0 = time.perf_counter()
+            model.embed_query(question)
+            timings.append((time.perf_counter() - t0) * 1000)
+    return np.percentile(timings, [50, 95])
+
+
+if __name__ == "__main__":
+    texts = sample_chunks()
+
+    results = {}
+    for backend in BACKENDS:
+        model = get_embedding_model(backend)
+        model.embed_query("warm-up")
+
+        t0 = time.perf_counter()
+        doc_vectors = np.asarray(
+            BucketedEmbeddings(model).embed_documents(texts),
+            dtype=np.float32,
+        )
+        docs_per_s = len(texts) / (time.perf_counter() - t0)
+
+        query_vectors = np.asarray(
+            [model.embed_query(q) for q in RETRIEVAL_QUESTIONS],
+            dtype=np.float32,
+        )
+        results[backend] = {
+            'docs_per_s': docs_per_s,
+            'latency': latencies_ms(model),
+            'top_k': top_k(doc_vectors, query_vectors),
+        }
+
+    reference = results['torch']['top_k']
+
+    print("═" * 60)
+    print("  BENCHMARK backends d'embedding")
+    print("═" * 60)
+    print(f"  {len(texts)} chunks, {len(RETRIEVAL_QUESTIONS)} questions")
+    for backend, res in results.items():
+        recall = np.mean([
+            len(set(found) & set(expected)) / TOP_K
+            for found, expected in zip(res['top_k'], reference)
+        ])
+        p50, p95 = res['latency']
+        print(
+            f"  {backend:9s} : {res['docs_per_s']:7.1f} docs/s | "
+            f"requête p50 {p50:5.1f} ms, p95 {p95:5.1f} ms | "
+            f"recall@{TOP_K} {recall:.3f}"
+        )
@@ -0,0 +1,219 @@
+# bench_process_jsonl.py
+"""
+Benchmark de process_to_jsonl : boucle iterrows vs mode colonnes
+vs pool de processus vs lecture par blocs, sur une arborescence
+cleaned_data synthétique. Vérifie aussi que les sorties sont
+identiques octet par octet, et compare le pic mémoire d'un gros
+canal (N_BIG_POSTS ≫ CHUNK_ROWS) entre lecture complète et lecture
+par blocs : ingestion seule (tracemalloc), puis pipeline complet
+(ingestion + corpus Parquet, pic RSS d'un processus neuf : mémoire
+d'Arrow et de pandas comprise).
+"""
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+import pandas as pd
+
+from process_jsonl import (
+    POST_META_SCHEMA, new_counters, process_channel, process_to_jsonl,
+)
+
+N_CATEGORIES = 3
+N_CHANNELS = 4          # par catégorie
+N_POSTS = 2000          # par canal
+N_REPLY_FILES = 40      # par canal
+N_REPLIES = 25          # par fichier
+N_BIG_POSTS = 200_000   # canal mesuré pour le pic mémoire
+
+WORDS = [
+    "combo", "mail", "pass", "fresh", "logs", "cloud", "crack",
+    "tool", "free", "cc", "dump", "vpn", "https://t.me/x", "|",
+]
+
+
+def random_message(rng):
+    if rng.random() < 0.05:
+        return None
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 60)))
+
+
+def make_posts(rng, n):
+    rows = []
+    for i in range(n):
+        row = {field: None for field in POST_META_SCHEMA}
+        row.update({
+            "Channel ID": 1000,
+            "Post ID": i + 1 if rng.random() > 0.01 else None,
+            "Message": random_message(rng),
+            "url": f"https://t.me/c/{i + 1}",
+            "date": f"2024-01-{rng.randint(1, 28):02d} 12:00:00",
+            "views": rng.randint(0, 50000),
+            "forwards": rng.choice([0, 1, 5, None]),
+            "replies": rng.randint(0, 30),
+            "pinned": rng.random() < 0.01,
+            "grouped_id": rng.choice([None, 1.3e16]),
+        })
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def make_replies(rng, n):
+    return pd.DataFrame([
+        {
+            "id": i + 1,
+            "message": random_message(rng),
+            "url": None,
+            "date": f"2024-02-{rng.randint(1, 28):02d} 08:00:00",
+            "views": None,
+            "forwards": None,
+            "reactions": rng.choice([None, "{'👍': 3}"]),
+        }
+        for i in range(n)
+    ])
+
+
+def build_tree(root, seed=0):
+    rng = random.Random(seed)
+    for c in range(N_CATEGORIES):
+        for ch in range(N_CHANNELS):
+            name = f"channel{c}_{ch}"
+            channel_dir = root / f"category{c}" / name
+            replies_dir = channel_dir / f"{name}_replies"
+            replies_dir.mkdir(parents=True)
+            make_posts(rng, N_POSTS).to_csv(
+                channel_dir / f"{name}.csv", index=False
+            )
+            for r in range(N_REPLY_FILES):
+                # Quelques parents absents du CSV → recovery
+                post_id = rng.randint(1, int(N_POSTS * 1.1))
+                make_replies(rng, N_REPLIES).to_csv(
+                    replies_dir / f"{r}_{post_id}_replies.csv",
+                    index=False,
+                )
+
+
+def build_big_channel(root, seed=1):
+    rng = random.Random(seed)
+    channel_dir = root / "big" / "big_channel"
+    channel_dir.mkdir(parents=True)
+    make_posts(rng, N_BIG_POSTS).to_csv(
+        channel_dir / "big_channel.csv", index=False
+    )
+    return channel_dir
+
+
+CHUNK_ROWS = 500
+
+
+def timed(**kwargs):
+    t0 = time.perf_counter()
+    process_to_jsonl(**kwargs)
+    return time.perf_counter() - t0
+
+
+def peak_memory(channel_dir, chunk_rows=None):
+    """Pic d'allocations Python/NumPy pendant l'ingestion d'un canal (Mo)."""
+    with open(os.devnull, 'w', encoding='utf-8') as f_out:
+        tracemalloc.start()
+        process_channel(
+            channel_dir, "big", f_out, new_counters(),
+            chunk_rows=chunk_rows, chunk_min_bytes=0,
+        )
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return peak / 1e6
+
+
+def peak_rss():
+    """
+    Pic RSS du processus (Mo), VmHWM de /proc (Linux) : remis à
+    zéro par exec, contrairement à ru_maxrss hérité du parent.
+    """
+    with open('/proc/self/status', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+
+
+def pipeline_rss(data_root, output_file, chunk_rows):
+    """(pic RSS après imports, pic RSS après pipeline), en Mo."""
+    before = peak_rss()
+    process_to_jsonl(
+        vectorized=True, data_root=data_root, output_file=output_file,
+        chunk_rows=chunk_rows, chunk_min_bytes=0,
+    )
+    return before, peak_rss()
+
+
+def pipeline_peak(data_root, output_file, chunk_rows=None):
+    """Pic RSS du pipeline complet, dans un processus neuf (Mo)."""
+    with ProcessPoolExecutor(1, mp_context=get_context('spawn')) as pool:
+        before, after = pool.submit(
+            pipeline_rss, data_root, output_file, chunk_rows
+        ).result()
+    return after - before
+
+
+if __name__ == "__main__":
+    tmp = Path(tempfile.mkdtemp(prefix="bench_jsonl_"))
+    try:
+        data_root = tmp / "cleaned_data"
+        build_tree(data_root)
+        out_rows = tmp / "rows.jsonl"
+        out_cols = tmp / "columnar.jsonl"
+
+        t_rows = timed(vectorized=False, data_root=data_root,
+                       output_file=out_rows)
+        t_cols = timed(vectorized=True, data_root=data_root,
+                       output_file=out_cols)
+        workers = os.cpu_count() or 1
+        out_par = tmp / "parallel.jsonl"
+        t_par = timed(vectorized=True, data_root=data_root,
+                      output_file=out_par, workers=workers)
+
+        out_chunk = tmp / "chunked.jsonl"
+        # chunk_min_bytes=0 : blocs forcés sur ces petits canaux
+        t_chunk = timed(vectorized=True, data_root=data_root,
+                        output_file=out_chunk, chunk_rows=CHUNK_ROWS,
+                        chunk_min_bytes=0)
+
+        big_channel = build_big_channel(tmp / "big_data")
+        big_mb = (big_channel / "big_channel.csv").stat().st_size / 1e6
+        mem_full = peak_memory(big_channel)
+        mem_chunk = peak_memory(big_channel, chunk_rows=CHUNK_ROWS)
+        big_root = big_channel.parent.parent
+        rss_full = pipeline_peak(big_root, tmp / "big_full.jsonl")
+        rss_chunk = pipeline_peak(
+            big_root, tmp / "big_chunked.jsonl", chunk_rows=CHUNK_ROWS
+        )
+
+        ref = out_rows.read_bytes()
+        identical = all(
+            out.read_bytes() == ref
+            for out in (out_cols, out_par, out_chunk)
+        )
+
+        print("═" * 50)
+        print("  BENCHMARK process_to_jsonl")
+        print("═" * 50)
+        print(f"  iterrows  : {t_rows:.2f} s")
+        print(f"  colonnes  : {t_cols:.2f} s")
+        print(f"  Speedup   : x{t_rows / t_cols:.1f}")
+        print(f"  {workers} workers : {t_par:.2f} s "
+              f"(x{t_cols / t_par:.1f} vs colonnes)")
+        print(f"  Blocs de {CHUNK_ROWS} : {t_chunk:.2f} s")
+        print(f"  Pic mémoire, canal de {N_BIG_POSTS} posts "
+              f"({big_mb:.0f} Mo) : {mem_full:.1f} Mo (complet) → "
+              f"{mem_chunk:.1f} Mo (blocs)")
+        print(f"  Pic RSS pipeline + Parquet : {rss_full:.0f} Mo "
+              f"(complet) → {rss_chunk:.0f} Mo (blocs)")
+        print(f"  Identique : {'✅' if identical else '❌'}")
+    finally:
+        shutil.rmtree(tmp)
@@ -0,0 +1,93 @@
+# bench_replies.py
+"""
+Expansion des replies (get_replies_for_post) sur un corpus 10×
+l'index actuel : filtre exact sur tout le docstore en mémoire
+(ancien chemin) vs table replies du docstore SQLite.
+Le corpus est répliqué avec des post_id / parent_post_id suffixés,
+pour garder la même distribution de replies par post.
+"""
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from langchain_community.docstore.in_memory import InMemoryDocstore
+
+from create_index import DOCSTORE_FILE, current_index_path
+from rag_chain import get_replies_for_post
+from sqlite_docstore import SQLiteDocstore, to_document, write_docstore
+
+SCALE = 10
+K = 10              # posts développés par question (retrieve_with_context)
+MAX_REPLIES = 5
+N_SCAN = 5          # questions mesurées en filtre exact (lent)
+N_INDEXED = 200     # questions mesurées via la table replies
+SEED = 42
+
+
+def replicate(path, scale=SCALE):
+    """Documents de la base `path`, répliqués `scale` fois."""
+    conn = sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro",
+                           uri=True)
+    rows = conn.execute(
+        "SELECT id, page_content, metadata FROM docs ORDER BY rowid"
+    ).fetchall()
+    conn.close()
+
+    docs = {}
+    for copy in range(scale):
+        for doc_id, page_content, metadata in rows:
+            doc = to_document(page_content, metadata)
+            for key in ('post_id', 'parent_post_id'):
+                if copy and doc.metadata.get(key):
+                    doc.metadata[key] = f"{doc.metadata[key]}-{copy}"
+            docs[f"{doc_id}-{copy}"] = doc
+    return docs
+
+
+def questions(docs, n):
+    """n questions = n tirages de K posts ayant des replies."""
+    parents = sorted({
+        doc.metadata['parent_post_id'] for doc in docs.values()
+        if doc.metadata.get('parent_post_id')
+    })
+    rng = random.Random(SEED)
+    return [rng.sample(parents, min(K, len(parents))) for _ in range(n)]
+
+
+def per_question_ms(vectorstore, post_lists):
+    t0 = time.perf_counter()
+    for post_ids in post_lists:
+        for post_id in post_ids:
+            get_replies_for_post(vectorstore, post_id, MAX_REPLIES)
+    return (time.perf_counter() - t0) * 1000 / len(post_lists)
+
+
+if __name__ == "__main__":
+    docs = replicate(current_index_path() / DOCSTORE_FILE)
+    post_lists = questions(docs, N_INDEXED)
+
+    in_memory = SimpleNamespace(docstore=InMemoryDocstore(docs))
+    scan_ms = per_question_ms(in_memory, post_lists[:N_SCAN])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / DOCSTORE_FILE
+        t0 = time.perf_counter()
+        write_docstore(in_memory.docstore, list(docs), path)
+        build_s = time.perf_counter() - t0
+
+        indexed = SimpleNamespace(docstore=SQLiteDocstore(path))
+        indexed_ms = per_question_ms(indexed, post_lists)
+        indexed.docstore._conn.close()
+
+    print("═" * 60)
+    print(f"  EXPANSION DES REPLIES ({SCALE}× le corpus)")
+    print("═" * 60)
+    print(f"  Documents      : {len(docs)}")
+    print(f"  Table replies  : écrite en {build_s:.1f} s (avec le docstore)")
+    print(f"  Par question ({K} posts, {MAX_REPLIES} replies max) :")
+    print(f"    filtre exact : {scan_ms:9.2f} ms ({N_SCAN} questions)")
+    print(f"    table replies: {indexed_ms:9.2f} ms ({N_INDEXED} questions)")
+    print(f"  Gain           : ×{scan_ms / indexed_ms:.0f}")
@@ -0,0 +1,77 @@
+# bench_retrieval.py
+"""
+Étape de retrieval (avant le LLM) : deux recherches séparées,
+une par requête (référence, ancien retrieve_with_context), vs un
+lot d'embedding + une recherche FAISS multi-requêtes, puis le même
+lot avec le cache des requêtes (questions répétées à chaque passe).
+La reformulation LLM est hors mesure : la query combinée est
+construite comme dans CTIAgent.analyze, la question tenant lieu
+de reformulation.
+"""
+import time
+
+import numpy as np
+
+from create_index import get_embedding_model, load_index
+from doc_type_filter import search_doc_type
+from embedding_cache import QueryCachedEmbeddings
+from embedding_pool import BucketedEmbeddings
+from eval_questions import RETRIEVAL_QUESTIONS
+
+K = 20      # k * 2 dans retrieve_with_context
+RUNS = 5    # passes sur les questions
+
+
+def separate(vectorstore, queries):
+    """Référence : une recherche (embedding + scan) par requête."""
+    return [
+        search_doc_type(vectorstore, [q], "original_post", k=K)[0]
+        for q in queries
+    ]
+
+
+def batched(vectorstore, queries):
+    return search_doc_type(vectorstore, queries, "original_post", k=K)
+
+
+def latencies_ms(vectorstore, search):
+    timings = []
+    for _ in range(RUNS):
+        for question in RETRIEVAL_QUESTIONS:
+            queries = [f"{question} {question} {question}", question]
+            t0 = time.perf_counter()
+            search(vectorstore, queries)
+            timings.append((time.perf_counter() - t0) * 1000)
+    return np.percentile(timings, [50, 95])
+
+
+if __name__ == "__main__":
+    # Sans cache de requêtes pour les deux premières mesures
+    vectorstore = load_index(BucketedEmbeddings(get_embedding_model()))
+    vectorstore.embedding_function.embed_query("warm-up")
+
+    # Mêmes résultats dans les deux modes
+    for question in RETRIEVAL_QUESTIONS:
+        queries = [f"{question} {question} {question}", question]
+        reference = separate(vectorstore, queries)
+        fused = batched(vectorstore, queries)
+        assert [
+            [doc.page_content for doc, _ in hits] for hits in reference
+        ] == [
+            [doc.page_content for doc, _ in hits] for hits in fused
+        ], question
+
+    print("═" * 60)
+    print("  RETRIEVAL : 2 recherches vs 1 recherche en lot")
+    print("═" * 60)
+    print(f"  {len(RETRIEVAL_QUESTIONS)} questions × {RUNS} passes, k={K}")
+    for name, search in [('séparées', separate), ('en lot', batched)]:
+        p50, p95 = latencies_ms(vectorstore, search)
+        print(f"  {name:16s} : p50 {p50:6.1f} ms | p95 {p95:6.1f} ms")
+
+    vectorstore.embedding_function = QueryCachedEmbeddings(
+        vectorstore.embedding_function
+    )
+    p50, p95 = latencies_ms(vectorstore, batched)
+    print(f"  {'en lot + cache':16s} : p50 {p50:6.1f} ms | p95 {p95:6.1f} ms")
+    vectorstore.embedding_function.print_stats()
@@ -0,0 +1,145 @@
+# bench_split.py
+"""
+Benchmark du split : ancien split caractères en deux passes
+(RecursiveCharacterTextSplitter + re-tokenisation + re-split
+agressif) vs split sur offsets de tokens (split_batch), sur
+des posts CTI synthétiques. Vérifie qu'aucun chunk ne dépasse
+la limite de 384 tokens d'all-mpnet-base-v2, ni MAX_TOKENS une
+fois re-tokenisé, y compris sur des posts à longs blobs base64 /
+hex sans séparateur (coupes en plein mot).
+"""
+import random
+import string
+import time
+
+from langchain_core.documents import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from load_documents import new_split_stats, split_batch
+from tokens import MODEL_MAX_TOKENS, count_tokens, get_tokenizer
+
+N_DOCS = 5000
+N_BLOB_DOCS = 200
+MAX_TOKENS = 300
+
+WORDS = [
+    "combo", "mail", "pass", "fresh", "logs", "cloud", "crack",
+    "tool", "free", "cc", "dump", "vpn", "https://t.me/x",
+    "192.168.1.1", "user@mail.com:P4ssw0rd!", "4111111111111111|12|26",
+]
+SEPS = ["\n\n", "\n", " | ", "  "]
+BLOB_ALPHABETS = [
+    string.ascii_letters + string.digits + "+/",   # base64
+    string.hexdigits[:16],                        # hex
+]
+
+
+def random_post(rng):
+    n = rng.choice([rng.randint(5, 100), rng.randint(200, 3000)])
+    parts = []
+    for _ in range(n):
+        parts.append(rng.choice(WORDS))
+        parts.append(rng.choice(SEPS) if rng.random() < 0.1 else " ")
+    return "".join(parts).strip()
+
+
+def random_blob_post(rng):
+    """Clé / dump encodé d'un seul tenant (2 000 à 8 000 caractères)."""
+    alphabet = rng.choice(BLOB_ALPHABETS)
+    blob = "".join(rng.choices(alphabet, k=rng.randint(2000, 8000)))
+    return f"{rng.choice(WORDS)} {blob}"
+
+
+def make_blob_docs(seed=1):
+    rng = random.Random(seed)
+    return [
+        Document(page_content=random_blob_post(rng), metadata={"i": i})
+        for i in range(N_BLOB_DOCS)
+    ]
+
+
+def make_docs(seed=0):
+    rng = random.Random(seed)
+    return [
+        Document(page_content=random_post(rng), metadata={"i": i})
+        for i in range(N_DOCS)
+    ]
+
+
+def char_split(documents, max_tokens=MAX_TOKENS):
+    """Ancien smart_split (référence)."""
+    tokenizer = get_tokenizer()
+    max_chars = max_tokens * 2
+    short_docs, long_docs = [], []
+    for doc in documents:
+        if len(tokenizer.encode(doc.page_content)) > max_tokens:
+            long_docs.append(doc)
+        else:
+            short_docs.append(doc)
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=max_chars,
+        chunk_overlap=int(max_chars * 0.15),
+        separators=["\n\n", "\n", " | ", "  ", " "],
+        keep_separator=True,
+        strip_whitespace=True,
+    )
+    ok_docs, still_long = [], []
+    for doc in splitter.split_documents(long_docs):
+        if len(tokenizer.encode(doc.page_content)) > MODEL_MAX_TOKENS:
+            still_long.append(doc)
+        else:
+            ok_docs.append(doc)
+
+    if still_long:
+        aggressive_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=350,
+            chunk_overlap=50,
+            separators=["\n", " ", ""],
+            keep_separator=False,
+            strip_whitespace=True,
+        )
+        ok_docs.extend(aggressive_splitter.split_documents(still_long))
+    return short_docs + ok_docs
+
+
+def token_split(documents, max_tokens=MAX_TOKENS):
+    return split_batch(documents, new_split_stats(), max_tokens=max_tokens)
+
+
+def timed(split, documents):
+    t0 = time.perf_counter()
+    chunks = split(documents)
+    return time.perf_counter() - t0, chunks
+
+
+if __name__ == "__main__":
+    get_tokenizer()  # chargement hors chrono
+
+    t_char, char_chunks = timed(char_split, make_docs())
+    t_tok, tok_chunks = timed(token_split, make_docs())
+
+    char_counts = count_tokens(d.page_content for d in char_chunks)
+    tok_counts = count_tokens(d.page_content for d in tok_chunks)
+    over = sum(1 for tok in tok_counts if tok > MODEL_MAX_TOKENS)
+    over_budget = sum(1 for tok in tok_counts if tok > MAX_TOKENS)
+
+    blob_chunks = token_split(make_blob_docs())
+    blob_counts = count_tokens(d.page_content for d in blob_chunks)
+    blob_over = sum(1 for tok in blob_counts if tok > MAX_TOKENS)
+
+    print("═" * 50)
+    print("  BENCHMARK split")
+    print("═" * 50)
+    print(f"  Caractères (2 passes) : {t_char:.2f} s, "
+          f"{len(char_chunks)} chunks, max {max(char_counts)} tokens")
+    print(f"  Offsets de tokens     : {t_tok:.2f} s, "
+          f"{len(tok_chunks)} chunks, max {max(tok_counts)} tokens")
+    print(f"  Speedup   : x{t_char / t_tok:.1f}")
+    print(f"  > {MODEL_MAX_TOKENS} tokens : {over} "
+          f"{'✅' if over == 0 else '❌'}")
+    print(f"  > {MAX_TOKENS} tokens (re-tokenisés) : {over_budget} "
+          f"{'✅' if over_budget == 0 else '❌'}")
+    print(f"  Blobs : {N_BLOB_DOCS} posts → {len(blob_chunks)} chunks, "
+          f"max {max(blob_counts)} tokens, > {MAX_TOKENS} : {blob_over} "
+          f"{'✅' if blob_over == 0 else '❌'}")
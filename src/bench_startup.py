@@ -0,0 +1,83 @@
+# bench_startup.py
+"""
+Démarrage de l'agent : FAISS.load_local classique vs index mappé
+en mémoire (load_index(mmap=True)). Chaque mode est mesuré dans
+un processus neuf : temps de chargement de l'index (hors modèle
+d'embedding) et RSS du processus, séparée en mémoire anonyme
+(privée) et pages de fichiers (partageables via le page cache).
+Linux uniquement (/proc/self/status).
+"""
+import multiprocessing
+import time
+
+from create_index import get_embedding_model, load_index
+
+N_PROCESSES = 3   # processus chargés simultanément par mode
+
+
+def rss_mb():
+    status = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            status[key] = value
+    return {
+        key: int(status[key].split()[0]) / 1024
+        for key in ('VmRSS', 'RssAnon', 'RssFile')
+    }
+
+
+def child(mmap, results, ready, done):
+    embeddings = get_embedding_model()
+    before = rss_mb()
+    t0 = time.perf_counter()
+    vectorstore = load_index(embeddings, mmap=mmap)
+    load_s = time.perf_counter() - t0
+    vectorstore.similarity_search("warm-up", k=10)
+    after = rss_mb()
+
+    results.put({
+        'load_s': load_s,
+        **{key: after[key] - before[key] for key in after},
+    })
+    # Reste en vie tant que les autres processus chargent
+    ready.wait()
+    done.wait()
+
+
+def run(mmap):
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    ready = ctx.Barrier(N_PROCESSES + 1)
+    done = ctx.Event()
+    procs = [
+        ctx.Process(target=child, args=(mmap, results, ready, done))
+        for _ in range(N_PROCESSES)
+    ]
+    for proc in procs:
+        proc.start()
+    stats = [results.get() for _ in procs]
+    ready.wait()
+    done.set()
+    for proc in procs:
+        proc.join()
+    return stats
+
+
+def mean(stats, key):
+    return sum(s[key] for s in stats) / len(stats)
+
+
+if __name__ == "__main__":
+    modes = {'load_local': run(False), 'mmap': run(True)}
+
+    print("═" * 60)
+    print(f"  DÉMARRAGE ({N_PROCESSES} processus par mode)")
+    print("═" * 60)
+    for name, stats in modes.items():
+        print(
+            f"  {name:10s} : index chargé en {mean(stats, 'load_s'):.3f} s"
+            f" | RSS +{mean(stats, 'VmRSS'):.0f} Mo"
+            f" (privée +{mean(stats, 'RssAnon'):.0f} Mo,"
+            f" fichiers partagés +{mean(stats, 'RssFile'):.0f} Mo)"
+        )
@@ -7,9 +7,18 @@ from collections import Counter
 from pathlib import Path
 import logging
 
+from corpus import (
+    has_corpus, iter_corpus_records, open_text, resolve_jsonl,
+)
+
 # Config
-DATA_JSONL = Path('JSONL') / 'darkgram_cti_final.jsonl'
+DATA_JSONL = Path('JSONL') / 'darkgram_cti_final.jsonl'  # ou .zst / .gz
 OUTPUT_IMG = 'cti_dashboard_final.png'
+# Colonnes utiles si le corpus Parquet existe
+CORPUS_COLUMNS = [
+    'text', 'doc_type', 'recovered', 'parent_post_id', 'category',
+    'channel_id', 'channel id', 'channel_name',
+]
 
 # Logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
@@ -19,12 +28,15 @@ data = []
 errors = 0
 logging.info("🔍 Chargement du fichier JSONL...")
 try:
-    with open(DATA_JSONL, 'r', encoding='utf-8') as f:
-        for i, line in enumerate(f):
-            try:
-                data.append(json.loads(line))
-            except Exception as e:
-                errors += 1
+    if has_corpus(DATA_JSONL):
+        data = list(iter_corpus_records(DATA_JSONL, columns=CORPUS_COLUMNS))
+    else:
+        with open_text(resolve_jsonl(DATA_JSONL)) as f:
+            for i, line in enumerate(f):
+                try:
+                    data.append(json.loads(line))
+                except Exception as e:
+                    errors += 1
     logging.info(f"✅ Chargement terminé. {errors} lignes corrompues ignorées.")
 except FileNotFoundError:
     logging.error(f"Fichier introuvable: {DATA_JSONL}")
@@ -0,0 +1,290 @@
+# corpus.py
+"""
+Corpus colonnaire (Parquet) écrit à côté de darkgram_cti_final.jsonl.
+
+Une colonne par champ de métadonnées, plus :
+- text     : texte structuré d'origine
+- content  : contenu après CONTENT:
+- post_id  : POST_ID (ou PARENT_POST_ID pour une reply)
+- reply_id : REPLY_ID
+Les lecteurs ne chargent que les colonnes demandées, sans
+json.loads ni regex sur le texte.
+"""
+
+import gzip
+import json
+import re
+from pathlib import Path
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Corpus Parquet optionnel
+    pa = None
+    pq = None
+
+try:
+    import zstandard as zstd
+except ImportError:  # JSONL .zst optionnel
+    zstd = None
+
+BATCH_ROWS = 50_000
+# Écriture : un row group par lot de WRITE_BATCH_ROWS lignes, ou
+# moins dès WRITE_BATCH_CHARS caractères de texte (posts longs) ;
+# ~5 Ko de RAM par ligne en attente (35 colonnes d'objets Python)
+WRITE_BATCH_ROWS = 10_000
+WRITE_BATCH_CHARS = 4 * 1024 * 1024
+
+DERIVED_COLUMNS = ['text', 'content', 'post_id', 'reply_id']
+
+# Suffixes de compression du JSONL reconnus (ordre de recherche)
+COMPRESSIONS = {'.zst': 'zst', '.gz': 'gz'}
+GZIP_LEVEL = 6
+
+# Clés de métadonnées de chaque ligne (posts, recovered et
+# replies n'ont pas les mêmes) : distingue "absent" de "null".
+KEYS_COLUMN = '_meta_keys'
+
+ARROW_TYPES = {
+    bool: 'bool_',
+    int: 'int64',
+    float: 'float64',
+    str: 'string',
+}
+
+
+# ══════════════════════════════════════════════
+# JSONL COMPRESSÉ (.jsonl.zst / .jsonl.gz)
+# ══════════════════════════════════════════════
+
+def compression_of(path):
+    return COMPRESSIONS.get(Path(path).suffix)
+
+
+def open_text(path, mode='r', compression=None):
+    """
+    open() texte UTF-8, avec (dé)compression en flux selon le
+    suffixe de `path` (ou `compression` pour un fichier .tmp).
+    """
+    compression = compression or compression_of(path)
+    if compression == 'zst':
+        if zstd is None:
+            raise ImportError("zstandard requis pour les fichiers .zst")
+        return zstd.open(path, mode + 't', encoding='utf-8')
+    if compression == 'gz':
+        return gzip.open(
+            path, mode + 't', encoding='utf-8',
+            compresslevel=GZIP_LEVEL,
+        )
+    return open(path, mode, encoding='utf-8')
+
+
+def resolve_jsonl(jsonl_path):
+    """darkgram_cti_final.jsonl, sinon sa version .zst / .gz."""
+    jsonl_path = Path(jsonl_path)
+    if jsonl_path.exists() or compression_of(jsonl_path):
+        return jsonl_path
+    for suffix in COMPRESSIONS:
+        candidate = jsonl_path.with_name(jsonl_path.name + suffix)
+        if candidate.exists():
+            return candidate
+    return jsonl_path
+
+
+def strip_compression(path):
+    path = Path(path)
+    return path.with_suffix('') if compression_of(path) else path
+
+
+# ══════════════════════════════════════════════
+# EXTRACTION DEPUIS LE TEXTE STRUCTURÉ
+# ══════════════════════════════════════════════
+
+def extract_content(text):
+    """Extrait UNIQUEMENT le contenu après CONTENT:"""
+    match = re.search(r'CONTENT:\s*(.+)$', text, re.DOTALL)
+    if match:
+        return match.group(1).strip()
+    return text.strip()
+
+
+def extract_ids(text):
+    """(post_id, reply_id) ; post_id = parent pour une reply."""
+    match_post = re.search(r'\[POST_ID:\s*(\d+)\]', text)
+    match_parent = re.search(r'\[PARENT_POST_ID:\s*(\d+)\]', text)
+    match_reply = re.search(r'\[REPLY_ID:\s*(\d+)\]', text)
+
+    post_id = match_post.group(1) if match_post else ""
+    if match_parent:
+        post_id = match_parent.group(1)
+    reply_id = match_reply.group(1) if match_reply else ""
+    return post_id, reply_id
+
+
+# ══════════════════════════════════════════════
+# ÉCRITURE
+# ══════════════════════════════════════════════
+
+def corpus_path(jsonl_path):
+    return strip_compression(jsonl_path).with_suffix('.parquet')
+
+
+def has_corpus(jsonl_path):
+    """Le corpus Parquet existe et est plus récent que le JSONL."""
+    path = corpus_path(jsonl_path)
+    if pa is None or not path.exists():
+        return False
+    jsonl_path = resolve_jsonl(jsonl_path)
+    return (
+        not jsonl_path.exists()
+        or path.stat().st_mtime_ns >= jsonl_path.stat().st_mtime_ns
+    )
+
+
+def iter_jsonl(jsonl_path):
+    with open_text(resolve_jsonl(jsonl_path)) as f:
+        for line in f:
+            yield json.loads(line.strip())
+
+
+def infer_schema(jsonl_path):
+    """
+    1ère passe : type Arrow de chaque champ de métadonnées.
+    Un champ aux types mélangés est stocké en JSON (string).
+    """
+    types = {}
+    for obj in iter_jsonl(jsonl_path):
+        for key, value in obj.get('metadata', {}).items():
+            seen = types.setdefault(key, set())
+            if value is not None:
+                seen.add(type(value))
+
+    fields = [
+        pa.field('text', pa.string()),
+        pa.field('content', pa.string()),
+        pa.field('post_id', pa.string()),
+        pa.field('reply_id', pa.string()),
+        pa.field(KEYS_COLUMN, pa.dictionary(pa.int32(), pa.string())),
+    ]
+    json_fields = []
+    for key, seen in types.items():
+        if len(seen) == 1 and next(iter(seen)) in ARROW_TYPES:
+            arrow_type = getattr(pa, ARROW_TYPES[seen.pop()])()
+        else:
+            arrow_type = pa.string()
+            if seen:
+                json_fields.append(key)
+        fields.append(pa.field(key, arrow_type))
+
+    return pa.schema(fields, metadata={
+        'meta_fields': json.dumps(list(types)),
+        'json_fields': json.dumps(json_fields),
+    })
+
+
+def write_corpus(jsonl_path, parquet_path=None):
+    """
+    JSONL → Parquet, par lots de WRITE_BATCH_ROWS lignes ou
+    WRITE_BATCH_CHARS caractères de texte (le premier atteint) :
+    RAM bornée, indépendante de la taille du corpus.
+    """
+    if pa is None:
+        print("  ⚠️ pyarrow absent : corpus Parquet non écrit")
+        return None
+
+    parquet_path = Path(parquet_path or corpus_path(jsonl_path))
+    schema = infer_schema(jsonl_path)
+    meta_fields = json.loads(schema.metadata[b'meta_fields'])
+    json_fields = set(json.loads(schema.metadata[b'json_fields']))
+
+    def flush(columns, writer):
+        writer.write_table(pa.table(columns, schema=schema))
+        for values in columns.values():
+            values.clear()
+
+    tmp_path = parquet_path.with_name(parquet_path.name + '.tmp')
+    n_rows = 0
+    batch_chars = 0
+    with pq.ParquetWriter(tmp_path, schema) as writer:
+        columns = {name: [] for name in schema.names}
+        for obj in iter_jsonl(jsonl_path):
+            text = obj.get('text', '')
+            metadata = obj.get('metadata', {})
+            post_id, reply_id = extract_ids(text)
+            columns['text'].append(text)
+            columns['content'].append(extract_content(text))
+            columns['post_id'].append(post_id)
+            columns['reply_id'].append(reply_id)
+            columns[KEYS_COLUMN].append(json.dumps(list(metadata)))
+            for key in meta_fields:
+                value = metadata.get(key)
+                if key in json_fields and value is not None:
+                    value = json.dumps(value, ensure_ascii=False)
+                columns[key].append(value)
+            n_rows += 1
+            batch_chars += len(text)
+            if (len(columns['text']) >= WRITE_BATCH_ROWS
+                    or batch_chars >= WRITE_BATCH_CHARS):
+                flush(columns, writer)
+                batch_chars = 0
+        if columns['text']:
+            flush(columns, writer)
+
+    tmp_path.replace(parquet_path)
+    print(f"  🧱 Corpus Parquet : {parquet_path} ({n_rows} lignes)")
+    return parquet_path
+
+
+# ══════════════════════════════════════════════
+# LECTURE
+# ══════════════════════════════════════════════
+
+def iter_corpus_records(jsonl_path, columns=None,
+                        batch_rows=BATCH_ROWS):
+    """
+    Enregistrements {'text', 'content', 'post_id', 'reply_id',
+    'metadata'} lus depuis le Parquet. `columns` restreint les
+    colonnes chargées (champs dérivés et/ou de métadonnées) ;
+    les clés absentes d'une ligne restent absentes de metadata.
+    """
+    pf = pq.ParquetFile(corpus_path(jsonl_path))
+    schema_meta = pf.schema_arrow.metadata
+    meta_fields = json.loads(schema_meta[b'meta_fields'])
+    json_fields = set(json.loads(schema_meta[b'json_fields']))
+
+    wanted = DERIVED_COLUMNS + meta_fields
+    if columns is not None:
+        wanted = [c for c in wanted if c in columns]
+    derived = [c for c in wanted if c in DERIVED_COLUMNS]
+    meta_cols = [c for c in wanted if c not in DERIVED_COLUMNS]
+
+    keys_cache = {}
+    for batch in pf.iter_batches(
+        batch_size=batch_rows, columns=wanted + [KEYS_COLUMN],
+    ):
+        data = batch.to_pydict()
+        for i, keys_json in enumerate(data[KEYS_COLUMN]):
+            keys = keys_cache.get(keys_json)
+            if keys is None:
+                loaded = set(meta_cols)
+                keys = [
+                    k for k in json.loads(keys_json) if k in loaded
+                ]
+                keys_cache[keys_json] = keys
+
+            metadata = {}
+            for key in keys:
+                value = data[key][i]
+                if key in json_fields and value is not None:
+                    value = json.loads(value)
+                metadata[key] = value
+
+            record = {name: data[name][i] for name in derived}
+            record['metadata'] = metadata
+            yield record
+
+
+def read_corpus(jsonl_path, columns=None):
+    """Colonnes du corpus en DataFrame pandas (analytique)."""
+    table = pq.read_table(corpus_path(jsonl_path), columns=columns)
+    return table.to_pandas()
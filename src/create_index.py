@@ -3,24 +3,83 @@
 Création de l'index FAISS avec all-mpnet-base-v2
 """
 
+import hashlib
+import json
+import os
+import shutil
+import uuid
 from pathlib import Path
+
+import faiss
+import numpy as np
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
 
+from ann_index import (
+    MMAP_IO_FLAGS, build_ann_index, index_type_of, index_vectors,
+    tune_index,
+)
+from doc_type_filter import (
+    DOC_TYPES_FILE, load_doc_type_selectors, write_doc_types,
+)
+from embedding_cache import (
+    QUERY_CACHE_FILE, CachedEmbeddings, EmbeddingCache,
+    QueryCachedEmbeddings, cache_dir, content_hash,
+)
+from embedding_pool import BucketedEmbeddings, ParallelEmbeddings
+from sqlite_docstore import SQLiteDocstore, write_docstore
+from tokens import MODEL_NAME
+
 FAISS_INDEX_PATH = Path('faiss_cti_index')
+EMBEDDING_CACHE_PATH = Path('embedding_cache')
+INDEX_FILE = 'index.faiss'
+DOCSTORE_FILE = 'docstore.sqlite'
+MANIFEST_FILE = 'doc_ids.json'   # ids des chunks, ordre de l'index
+CURRENT_FILE = 'CURRENT'         # nom de la version servie
+VERSION_PREFIX = 'v-'            # répertoire v-<build id>
+LEGACY_FILES = (INDEX_FILE, 'index.pkl', DOCSTORE_FILE,
+                DOC_TYPES_FILE, MANIFEST_FILE)
+
+# Build multi-processus : ~4 threads intra-op par worker
+EMBED_WORKERS = max(1, (os.cpu_count() or 1) // 4)
+
+# 'torch' (sentence-transformers), 'onnx' (ONNX Runtime fp32)
+# ou 'onnx-int8' (quantification dynamique)
+EMBEDDING_BACKEND = 'torch'
+
+# Cache des requêtes de l'agent relu / écrit sur disque
+PERSIST_QUERY_CACHE = True
+
+# Type d'index : 'flat' (exact), 'hnsw', 'ivf-flat' ou 'ivf-pq'
+# (paramètres dans ann_index.py)
+INDEX_TYPE = 'flat'
 
 
 # 2_create_index.py
 
-def get_embedding_model():
+def get_embedding_model(backend=None, threads=None):
     """
     all-mpnet-base-v2 :
     - 768 dimensions
     - 384 tokens max
     - Meilleure qualité théorique
+    backend : EMBEDDING_BACKEND par défaut ; un index doit être
+    interrogé avec le backend qui l'a construit.
     """
+    backend = backend or EMBEDDING_BACKEND
+    if backend in ('onnx', 'onnx-int8'):
+        from onnx_embeddings import OnnxEmbeddings
+
+        return OnnxEmbeddings(
+            quantized=(backend == 'onnx-int8'),
+            threads=threads,
+            batch_size=64,
+        )
+    if backend != 'torch':
+        raise ValueError(f"Backend d'embedding inconnu : {backend}")
+
     return HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-mpnet-base-v2",
+        model_name=MODEL_NAME,
         model_kwargs={
             'device': 'cpu',
         },
@@ -31,50 +90,474 @@ def get_embedding_model():
     )
 
 
-def create_index(documents):
+def get_cached_embedding_model(workers=1):
+    """
+    Modèle d'embedding + cache disque par hash de contenu ;
+    workers > 1 : embedding réparti sur un pool de processus.
+    Lots groupés par longueur en tokens dans les deux cas.
+    """
+    embeddings = get_embedding_model()
+    if workers > 1:
+        embeddings = ParallelEmbeddings(
+            embeddings, workers, EMBEDDING_BACKEND
+        )
+    else:
+        embeddings = BucketedEmbeddings(embeddings)
+
+    return CachedEmbeddings(
+        embeddings,
+        EmbeddingCache(EMBEDDING_CACHE_PATH, embedding_cache_name()),
+    )
+
+
+def embedding_cache_name():
+    # Vecteurs ONNX ≠ vecteurs PyTorch : un cache par backend
+    if EMBEDDING_BACKEND != 'torch':
+        return f"{MODEL_NAME}@{EMBEDDING_BACKEND}"
+    return MODEL_NAME
+
+
+def get_query_embedding_model():
+    """Modèle d'embedding des requêtes de l'agent, avec cache LRU."""
+    path = None
+    if PERSIST_QUERY_CACHE:
+        path = (
+            cache_dir(EMBEDDING_CACHE_PATH, embedding_cache_name())
+            / QUERY_CACHE_FILE
+        )
+    return QueryCachedEmbeddings(
+        BucketedEmbeddings(get_embedding_model()), path=path,
+    )
+
+
+def finish_embeddings(embeddings):
+    """Stats du cache (et des workers), puis arrêt du pool."""
+    print(f"  ♻️  Embeddings : {embeddings.hits} en cache, "
+          f"{embeddings.misses} calculés")
+    if isinstance(embeddings.embeddings, ParallelEmbeddings):
+        embeddings.embeddings.print_stats()
+        embeddings.embeddings.close()
+
+
+# ══════════════════════════════════════════════
+# IDS STABLES + SAUVEGARDE ATOMIQUE
+# ══════════════════════════════════════════════
+
+def doc_id(doc):
+    """Id stable d'un chunk : sa source et son contenu."""
+    meta = doc.metadata
+    key = json.dumps([
+        meta.get('channel_name', ''), meta.get('doc_type', ''),
+        meta.get('post_id', ''), meta.get('reply_id', ''),
+        doc.page_content,
+    ], ensure_ascii=False)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def metadata_digest(meta):
+    """
+    Empreinte des métadonnées d'un chunk (vues, forwards,
+    duplicate_count...), gardée dans le manifeste : un changement
+    de métadonnées seules est mis à jour dans le docstore, sans
+    toucher à l'index FAISS.
+    """
+    key = json.dumps(meta, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def assign_ids(documents, seen):
+    """Ids d'un lot ; `seen` (ids déjà attribués) lève les collisions."""
+    ids = []
+    for doc in documents:
+        base = doc_id(doc)
+        id_, n = base, 1
+        while id_ in seen:
+            id_, n = f"{base}-{n}", n + 1
+        seen.add(id_)
+        ids.append(id_)
+    return ids
+
+
+def current_index_path(index_path=FAISS_INDEX_PATH):
+    """
+    Répertoire de la version servie (pointeur CURRENT) ;
+    index_path lui-même pour l'ancien format, sans versions.
+    """
+    index_path = Path(index_path)
+    pointer = index_path / CURRENT_FILE
+    if not pointer.exists():
+        return index_path
+    return index_path / pointer.read_text(encoding='utf-8').strip()
+
+
+def read_manifest(index_path=FAISS_INDEX_PATH):
+    path = current_index_path(index_path) / MANIFEST_FILE
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def load_manifest(index_path=FAISS_INDEX_PATH):
+    manifest = read_manifest(index_path)
+    return None if manifest is None else manifest['ids']
+
+
+def stored_digest(vectorstore, id_):
+    """Empreinte du manifeste ; recalculée du docstore si absente."""
+    digest = vectorstore.metadata_digests.get(id_)
+    if digest is None:
+        digest = metadata_digest(vectorstore.docstore.search(id_).metadata)
+        vectorstore.metadata_digests[id_] = digest
+    return digest
+
+
+def update_metadata(vectorstore, documents):
+    """Documents déjà indexés (id → Document), métadonnées changées."""
+    docstore = vectorstore.docstore
+    if isinstance(docstore, SQLiteDocstore):
+        docstore.update(documents)
+    else:
+        docstore.delete(list(documents))
+        docstore.add(documents)
+    for id_, doc in documents.items():
+        vectorstore.metadata_digests[id_] = metadata_digest(doc.metadata)
+
+
+def index_version(index_path=FAISS_INDEX_PATH):
+    """
+    Build id de la version servie (répertoire v-<build id> pointé
+    par CURRENT), relu sur disque : change à chaque sauvegarde,
+    quel que soit le processus qui l'a faite. Ancien format : date
+    du manifeste.
+    """
+    index_path = current_index_path(index_path)
+    if index_path.name.startswith(VERSION_PREFIX):
+        return index_path.name[len(VERSION_PREFIX):]
+    path = index_path / MANIFEST_FILE
+    if not path.exists():
+        path = index_path / INDEX_FILE   # ancien format
+    return str(path.stat().st_mtime_ns)
+
+
+def save_index(vectorstore, index_path=FAISS_INDEX_PATH):
+    """
+    index.faiss + docstore SQLite + bitmaps par doc_type +
+    manifeste (ids dans l'ordre de l'index, empreintes des
+    métadonnées) dans un nouveau
+    répertoire de version (index_path/v-<id>), puis bascule du
+    pointeur CURRENT par os.replace (atomique) : à tout instant
+    un lecteur trouve une version complète. La version précédente
+    est gardée pour les chargements en cours, les plus anciennes
+    sont supprimées.
+    """
+    index_path = Path(index_path)
+    previous = current_index_path(index_path)
+    version_path = index_path / f"{VERSION_PREFIX}{uuid.uuid4().hex}"
+
+    version_path.mkdir(parents=True)
+    positions = vectorstore.index_to_docstore_id
+    ids = [positions[pos] for pos in range(len(positions))]
+    vectorstore.metadata_digests = getattr(
+        vectorstore, 'metadata_digests', {}
+    )
+    digests = [stored_digest(vectorstore, id_) for id_ in ids]
+    vectorstore.metadata_digests = dict(zip(ids, digests))
+    faiss.write_index(vectorstore.index, str(version_path / INDEX_FILE))
+    write_docstore(
+        vectorstore.docstore, ids, version_path / DOCSTORE_FILE
+    )
+    write_doc_types(
+        version_path / DOCSTORE_FILE, ids, version_path / DOC_TYPES_FILE
+    )
+    (version_path / MANIFEST_FILE).write_text(
+        json.dumps({'ids': ids, 'metadata_digests': digests}),
+        encoding='utf-8',
+    )
+
+    pointer_tmp = index_path / (CURRENT_FILE + '.tmp')
+    pointer_tmp.write_text(version_path.name, encoding='utf-8')
+    os.replace(pointer_tmp, index_path / CURRENT_FILE)
+    prune_versions(index_path, keep={version_path, previous})
+
+    # Changements en attente écrits : on relit la nouvelle base
+    if isinstance(vectorstore.docstore, SQLiteDocstore):
+        vectorstore.docstore = SQLiteDocstore(
+            version_path / DOCSTORE_FILE
+        )
+    vectorstore.doc_type_selectors = load_doc_type_selectors(
+        version_path / DOC_TYPES_FILE
+    )
+    vectorstore.index_path = index_path
+    vectorstore.index_version = index_version(version_path)
+    print(f"  ✅ Sauvegardé : {version_path}/")
+
+
+def prune_versions(index_path, keep):
+    """Versions hors `keep` (et fichiers de l'ancien format) supprimées."""
+    for path in index_path.glob(f'{VERSION_PREFIX}*'):
+        if path not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+    if index_path not in keep:
+        for name in LEGACY_FILES:
+            (index_path / name).unlink(missing_ok=True)
+
+
+def convert_index(vectorstore, index_type):
+    """Index flat construit en flux → index ANN, mêmes positions."""
+    if index_type == index_type_of(vectorstore.index):
+        return vectorstore
+    print(f"  🧭 Index {index_type} : entraînement + ajout...")
+    vectorstore.index = build_ann_index(
+        index_vectors(vectorstore.index), index_type
+    )
+    return vectorstore
+
+
+def delete_docs(vectorstore, ids):
+    """
+    vectorstore.delete pour un index flat. HNSW ne supporte pas
+    remove_ids, et IVF le supporte sans renuméroter les positions
+    (index_to_docstore_id faussé) : ces index sont reconstruits
+    (et réentraînés) sur les vecteurs gardés (kept_vectors),
+    positions compactées.
+    """
+    index_type = index_type_of(vectorstore.index)
+    if index_type == 'flat':
+        vectorstore.delete(ids)
+        return
+
+    removed = set(ids)
+    positions = vectorstore.index_to_docstore_id
+    keep = [
+        pos for pos in sorted(positions) if positions[pos] not in removed
+    ]
+    vectorstore.index = build_ann_index(
+        kept_vectors(vectorstore, keep, index_type), index_type
+    )
+    vectorstore.docstore.delete(list(removed))
+    vectorstore.index_to_docstore_id = {
+        new_pos: positions[pos] for new_pos, pos in enumerate(keep)
+    }
+
+
+def kept_vectors(vectorstore, keep, index_type):
+    """
+    Vecteurs exacts des positions `keep`, relus du cache d'embeddings
+    (par contenu) : reconstruire IVF-PQ depuis reconstruct_n
+    re-quantifierait des vecteurs déjà approchés à chaque mise à
+    jour. Sans cache complet : vecteurs stockés (exacts pour flat,
+    HNSW, IVF-Flat), recalculés par le modèle pour IVF-PQ.
+    """
+    positions = vectorstore.index_to_docstore_id
+    texts = [
+        vectorstore.docstore.search(positions[pos]).page_content
+        for pos in keep
+    ]
+    embeddings = vectorstore.embedding_function
+    cache = getattr(embeddings, 'cache', None)
+    digests = [content_hash(text) for text in texts]
+
+    if cache is not None and all(d in cache for d in digests):
+        vectors = cache.get(digests)
+    elif index_type != 'ivf-pq':
+        return index_vectors(vectorstore.index)[keep]
+    else:
+        vectors = embeddings.embed_documents(texts)
+    vectors = np.array(vectors, dtype=np.float32)
+    if vectorstore._normalize_L2:
+        faiss.normalize_L2(vectors)
+    return vectors
+
+
+# ══════════════════════════════════════════════
+# CONSTRUCTION
+# ══════════════════════════════════════════════
+
+def create_index(documents, workers=1, index_type=INDEX_TYPE):
     """Crée et sauvegarde l'index FAISS."""
     print(f"\n🔄 Création de l'index FAISS...")
     print(f"  Modèle : all-mpnet-base-v2 (768 dims)")
     print(f"  Documents : {len(documents)}")
 
-    embeddings = get_embedding_model()
+    embeddings = get_cached_embedding_model(workers)
 
     vectorstore = FAISS.from_documents(
         documents=documents,
         embedding=embeddings,
+        ids=assign_ids(documents, set()),
     )
 
-    # Sauvegarde
-    vectorstore.save_local(str(FAISS_INDEX_PATH))
-    print(f"  ✅ Sauvegardé : {FAISS_INDEX_PATH}/")
+    finish_embeddings(embeddings)
+    convert_index(vectorstore, index_type)
+
+    save_index(vectorstore)
+
+    return vectorstore
+
+
+def create_index_from_batches(batches, workers=1,
+                              index_type=INDEX_TYPE):
+    """
+    Crée l'index FAISS lot par lot (load_documents.iter_prepared_batches) :
+    le corpus préparé n'est jamais matérialisé en entier.
+    """
+    print(f"\n🔄 Création de l'index FAISS (par lots)...")
+    print(f"  Modèle : all-mpnet-base-v2 (768 dims)")
+
+    embeddings = get_cached_embedding_model(workers)
+    vectorstore = None
+    n_docs = 0
+    seen = set()
+
+    for batch in batches:
+        if not batch:
+            continue
+        ids = assign_ids(batch, seen)
+        if vectorstore is None:
+            vectorstore = FAISS.from_documents(
+                documents=batch,
+                embedding=embeddings,
+                ids=ids,
+            )
+        else:
+            vectorstore.add_documents(batch, ids=ids)
+        n_docs += len(batch)
+        print(f"  … {n_docs} documents indexés")
+
+    if vectorstore is None:
+        raise ValueError("Aucun document à indexer")
+
+    finish_embeddings(embeddings)
+    convert_index(vectorstore, index_type)
+
+    save_index(vectorstore)
 
     return vectorstore
 
 
-def load_index():
-    """Charge un index existant."""
+def update_index(batches, workers=1):
+    """
+    Mise à jour incrémentale : les ids stables du corpus préparé
+    sont comparés au manifeste de l'index. Seuls les chunks
+    nouveaux ou modifiés sont embeddés ; ceux qui ont disparu
+    (ou changé) sont supprimés. Métadonnées seules modifiées
+    (vues, forwards...) : empreinte du manifeste différente,
+    document mis à jour dans le docstore, index FAISS inchangé.
+    Sauvegarde atomique.
+    """
+    print(f"\n🔄 Mise à jour de l'index FAISS...")
+
+    embeddings = get_cached_embedding_model(workers)
+    vectorstore = load_index(embeddings)
+    indexed = set(vectorstore.index_to_docstore_id.values())
+
+    seen = set()
+    n_added = n_updated = 0
+    for batch in batches:
+        ids = assign_ids(batch, seen)
+        new = []
+        changed = {}
+        for doc, id_ in zip(batch, ids):
+            if id_ not in indexed:
+                new.append((doc, id_))
+            elif (metadata_digest(doc.metadata)
+                  != stored_digest(vectorstore, id_)):
+                changed[id_] = doc
+        if new:
+            docs, new_ids = zip(*new)
+            vectorstore.add_documents(list(docs), ids=list(new_ids))
+            n_added += len(new)
+        if changed:
+            update_metadata(vectorstore, changed)
+            n_updated += len(changed)
+
+    removed = [id_ for id_ in indexed if id_ not in seen]
+    if removed:
+        delete_docs(vectorstore, removed)
+
+    print(f"  ➕ Ajoutés    : {n_added}")
+    print(f"  ➖ Supprimés  : {len(removed)}")
+    print(f"  ✏️  Mis à jour : {n_updated} (métadonnées)")
+    print(f"  📦 Vecteurs   : {vectorstore.index.ntotal}")
+    finish_embeddings(embeddings)
+
+    if n_added or removed or n_updated:
+        save_index(vectorstore)
+    else:
+        print("  ✅ Index déjà à jour")
+    return vectorstore
+
+
+# ══════════════════════════════════════════════
+# CHARGEMENT
+# ══════════════════════════════════════════════
+
+def load_index(embeddings=None, mmap=False):
+    """
+    Charge un index existant.
+    mmap=True : lecture seule, index.faiss mappé en mémoire
+    (démarrage quasi instantané, pages partagées entre les
+    processus d'un même hôte) ; l'index n'est pas modifiable.
+    """
     if not FAISS_INDEX_PATH.exists():
         raise FileNotFoundError(
 
         )
 
-    embeddings = get_embedding_model()
+    embeddings = embeddings or get_query_embedding_model()
+    io_flags = MMAP_IO_FLAGS if mmap else 0
+    # Une seule résolution du pointeur : tous les fichiers
+    # viennent de la même version
+    index_path = current_index_path()
 
-    vectorstore = FAISS.load_local(
-        str(FAISS_INDEX_PATH),
-        embeddings,
-        allow_dangerous_deserialization=True,
-    )
+    if (index_path / DOCSTORE_FILE).exists():
+        manifest = read_manifest(index_path)
+        vectorstore = FAISS(
+            embedding_function=embeddings,
+            index=faiss.read_index(
+                str(index_path / INDEX_FILE), io_flags
+            ),
+            docstore=SQLiteDocstore(index_path / DOCSTORE_FILE),
+            index_to_docstore_id=dict(enumerate(manifest['ids'])),
+        )
+        # Manifeste sans empreintes : recalculées à la demande
+        vectorstore.metadata_digests = dict(zip(
+            manifest['ids'], manifest.get('metadata_digests', []),
+        ))
+        vectorstore.doc_type_selectors = load_doc_type_selectors(
+            index_path / DOC_TYPES_FILE
+        )
+    else:
+        # Ancien format (docstore picklé) : converti au prochain
+        # create_index.py
+        vectorstore = FAISS.load_local(
+            str(index_path),
+            embeddings,
+            allow_dangerous_deserialization=True,
+            io_flags=io_flags,
+        )
+        vectorstore.metadata_digests = {}
+    tune_index(vectorstore.index)
+    vectorstore.index_path = FAISS_INDEX_PATH
+    vectorstore.index_version = index_version(index_path)
     print(
         f"✅ Index chargé : "
-        f"{vectorstore.index.ntotal} vecteurs"
+        f"{vectorstore.index.ntotal} vecteurs "
+        f"({index_type_of(vectorstore.index)})"
     )
     return vectorstore
 
 
 if __name__ == "__main__":
-    from load_documents import load_and_prepare
+    from load_documents import iter_prepared_batches
 
-    docs = load_and_prepare()
-    vectorstore = create_index(docs)
+    # Index existant : mise à jour incrémentale (flux horaire)
+    if FAISS_INDEX_PATH.exists():
+        vectorstore = update_index(
+            iter_prepared_batches(), workers=EMBED_WORKERS
+        )
+    else:
+        vectorstore = create_index_from_batches(
+            iter_prepared_batches(), workers=EMBED_WORKERS
+        )
     print(f"  Vecteurs : {vectorstore.index.ntotal}")
\ No newline at end of file
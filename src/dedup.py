@@ -0,0 +1,234 @@
+# dedup.py
+"""
+Élimination des posts quasi identiques (MinHash + LSH).
+
+Les mêmes combo lists / dumps de cartes sont transférés dans
+de nombreux canaux. On regroupe les original_post dont le
+contenu est quasi identique (Jaccard estimé ≥ THRESHOLD sur
+des shingles de mots) et on ne garde qu'un post canonique par
+groupe (le plus vu), qui porte :
+- duplicate_count    : nb de posts fusionnés dans celui-ci
+- duplicate_channels : canaux où le contenu a été publié
+Les replies des posts supprimés sont rattachées au post canonique
+(parent_post_id, canal et texte réécrits) : l'expansion des replies
+du post gardé les retrouve.
+
+darkgram_cti_final.jsonl → darkgram_cti_dedup.jsonl (+ Parquet)
+"""
+
+import json
+import zlib
+from collections import defaultdict, deque
+from pathlib import Path
+
+import numpy as np
+
+from corpus import (
+    extract_content, extract_ids, iter_jsonl, open_text, resolve_jsonl,
+    write_corpus,
+)
+from process_jsonl import build_reply_text
+
+JSONL_PATH = Path('darkgram_cti_final.jsonl')
+DEDUP_PATH = Path('darkgram_cti_dedup.jsonl')
+
+SHINGLE_SIZE = 3     # shingles de 3 mots
+NUM_PERM = 128       # permutations MinHash
+BANDS = 16           # LSH : 16 bandes x 8 lignes (seuil ≈ 0.7)
+THRESHOLD = 0.8      # Jaccard estimé minimal pour fusionner
+BUCKET_CANDIDATES = 8   # derniers posts gardés par bucket LSH
+SEED = 42
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+_rng = np.random.RandomState(SEED)
+PERM_A = _rng.randint(1, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+PERM_B = _rng.randint(0, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+
+
+# ══════════════════════════════════════════════
+# MINHASH
+# ══════════════════════════════════════════════
+
+def shingles(content):
+    words = content.lower().split()
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)}  # texte court : doublon exact
+    return {
+        " ".join(words[i:i + SHINGLE_SIZE])
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def minhash(content):
+    """Signature MinHash (NUM_PERM valeurs 32 bits)."""
+    hashes = np.fromiter(
+        (zlib.crc32(s.encode('utf-8')) for s in shingles(content)),
+        dtype=np.uint64,
+    )
+    permuted = (
+        (PERM_A[:, None] * hashes[None, :] + PERM_B[:, None])
+        % MERSENNE_PRIME
+    ) & MAX_HASH
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+# ══════════════════════════════════════════════
+# LSH + UNION-FIND
+# ══════════════════════════════════════════════
+
+def find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def cluster_signatures(signatures):
+    """
+    Index des signatures → racine de son groupe.
+    Chaque bucket LSH garde ses BUCKET_CANDIDATES derniers posts ;
+    une signature est comparée à ceux d'un autre groupe qu'elle.
+    Passe linéaire même quand des milliers de posts identiques
+    tombent dans le même bucket, sans dépendre du seul 1er arrivé
+    (qui peut être sous THRESHOLD alors qu'un suivant ne l'est pas).
+    """
+    rows = NUM_PERM // BANDS
+    parent = list(range(len(signatures)))
+    buckets = defaultdict(lambda: deque(maxlen=BUCKET_CANDIDATES))
+
+    for i, sig in enumerate(signatures):
+        for band in range(BANDS):
+            key = (band, sig[band * rows:(band + 1) * rows].tobytes())
+            for j in buckets[key]:
+                root_i, root_j = find(parent, i), find(parent, j)
+                if root_i == root_j:
+                    continue
+                if np.mean(sig == signatures[j]) >= THRESHOLD:
+                    parent[root_i] = root_j
+            buckets[key].append(i)
+
+    return [find(parent, i) for i in range(len(signatures))]
+
+
+def as_number(value):
+    return value if isinstance(value, (int, float)) else 0
+
+
+def reattach_reply(obj, channel, post_id):
+    """Reply d'un post supprimé → reply du post canonique."""
+    text = obj.get('text', '')
+    reply_id = extract_ids(text)[1]
+    obj['text'] = build_reply_text(
+        post_id, reply_id, channel, extract_content(text)
+    )
+    obj['metadata']['parent_post_id'] = post_id
+    obj['metadata']['channel_name'] = channel
+
+
+# ══════════════════════════════════════════════
+# PIPELINE
+# ══════════════════════════════════════════════
+
+def dedup_jsonl(jsonl_path=JSONL_PATH, output_path=DEDUP_PATH):
+    print("🧬 Déduplication MinHash/LSH des posts...")
+
+    # ─── PASSE 1 : signatures des original_post ───
+    signatures = []
+    posts = []   # (n° de ligne, vues, canal, post_id)
+    for line_no, obj in enumerate(iter_jsonl(jsonl_path)):
+        meta = obj.get('metadata', {})
+        if meta.get('doc_type') != 'original_post':
+            continue
+        text = obj.get('text', '')
+        content = extract_content(text)
+        if not content:
+            continue
+        signatures.append(minhash(content))
+        posts.append((
+            line_no,
+            as_number(meta.get('views')),
+            meta.get('channel_name', ''),
+            extract_ids(text)[0],
+        ))
+
+    roots = cluster_signatures(signatures)
+
+    clusters = defaultdict(list)
+    for idx, root in enumerate(roots):
+        clusters[root].append(idx)
+
+    # Post canonique = le plus vu (1er en cas d'égalité)
+    keep = {}     # n° de ligne → (duplicate_count, canaux)
+    moved = {}    # (canal, post_id) supprimé → (canal, post_id) gardé
+    for members in clusters.values():
+        canonical = max(members, key=lambda idx: posts[idx][1])
+        channels = []
+        for idx in members:
+            if posts[idx][2] not in channels:
+                channels.append(posts[idx][2])
+            if idx != canonical:
+                moved[posts[idx][2], posts[idx][3]] = (
+                    posts[canonical][2], posts[canonical][3]
+                )
+        keep[posts[canonical][0]] = (len(members) - 1, channels)
+    dropped = {posts[idx][0] for idx in range(len(posts))} - set(keep)
+
+    # ─── PASSE 2 : écriture ───
+    n_moved = 0
+    with open_text(output_path, 'w') as f_out:
+        for line_no, obj in enumerate(iter_jsonl(jsonl_path)):
+            if line_no in dropped:
+                continue
+            meta = obj['metadata']
+            if line_no in keep:
+                count, channels = keep[line_no]
+                meta['duplicate_count'] = count
+                meta['duplicate_channels'] = ", ".join(channels)
+            elif meta.get('doc_type') == 'reply':
+                target = moved.get((
+                    meta.get('channel_name', ''),
+                    str(meta.get('parent_post_id', '')),
+                ))
+                if target is not None:
+                    reattach_reply(obj, *target)
+                    n_moved += 1
+            f_out.write(json.dumps(obj, ensure_ascii=False) + '\n')
+
+    write_corpus(output_path)
+
+    # ─── RAPPORT ───
+    n_posts = len(posts)
+    merged = [m for m in clusters.values() if len(m) > 1]
+    print(f"\n{'═'*50}")
+    print(f"  ✅ DÉDUPLICATION TERMINÉE")
+    print(f"{'═'*50}")
+    print(f"  📄 Output           : {output_path}")
+    print(f"  📊 Posts analysés   : {n_posts}")
+    print(f"  🧩 Groupes > 1      : {len(merged)}")
+    print(f"     └─ Plus grand    : "
+          f"{max((len(m) for m in merged), default=0)} posts")
+    print(f"  🗑️  Supprimés        : {len(dropped)} "
+          f"({100 * len(dropped) / max(n_posts, 1):.1f}%)")
+    print(f"  📦 Posts restants   : {n_posts - len(dropped)}")
+    print(f"  🔁 Replies rattachées au post canonique : {n_moved}")
+    print(f"{'═'*50}\n")
+
+    return len(dropped)
+
+
+def dedup_is_fresh(jsonl_path=JSONL_PATH, output_path=DEDUP_PATH):
+    """Le corpus dédupliqué existe et suit le dernier JSONL."""
+    output_path = resolve_jsonl(output_path)
+    jsonl_path = resolve_jsonl(jsonl_path)
+    if not output_path.exists():
+        return False
+    return (
+        not jsonl_path.exists()
+        or output_path.stat().st_mtime_ns >= jsonl_path.stat().st_mtime_ns
+    )
+
+
+if __name__ == "__main__":
+    dedup_jsonl()
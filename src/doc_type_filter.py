@@ -0,0 +1,118 @@
+# doc_type_filter.py
+"""
+Recherche restreinte à un doc_type (original_post, reply...) par
+sélecteur d'ids FAISS, à la place de filter={"doc_type": ...}.
+
+Le filtre LangChain cherche fetch_k voisins puis filtre en Python :
+travail perdu sur les replies, et moins de k posts quand elles
+dominent le voisinage. Ici le sélecteur (bitmap des positions du
+doc_type) est appliqué pendant la recherche FAISS : seuls les
+vecteurs du doc_type sont évalués, et les k plus proches sont
+toujours rendus. Mêmes distances L2 que la recherche filtrée.
+
+Les bitmaps sont écrits avec l'index (doc_types.npz) à chaque
+sauvegarde : les positions changent après suppression.
+"""
+
+import sqlite3
+from pathlib import Path
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+
+DOC_TYPES_FILE = 'doc_types.npz'
+
+
+def write_doc_types(docstore_path, ids, path):
+    """Bitmap des positions (ordre de l'index) de chaque doc_type."""
+    conn = sqlite3.connect(
+        f"{Path(docstore_path).resolve().as_uri()}?mode=ro", uri=True
+    )
+    try:
+        doc_types = dict(conn.execute(
+            "SELECT id, json_extract(metadata, '$.doc_type') FROM docs"
+        ))
+    finally:
+        conn.close()
+
+    types = np.array([doc_types[doc_id] or '' for doc_id in ids])
+    np.savez(path, **{
+        doc_type: np.packbits(types == doc_type, bitorder='little')
+        for doc_type in np.unique(types) if doc_type
+    })
+
+
+def load_doc_type_selectors(path):
+    """{doc_type: IDSelectorBitmap} ; {} si l'index n'a pas de bitmaps."""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    with np.load(path) as bitmaps:
+        selectors = {}
+        for doc_type in bitmaps.files:
+            bitmap = bitmaps[doc_type]
+            selector = faiss.IDSelectorBitmap(
+                len(bitmap) * 8, faiss.swig_ptr(bitmap)
+            )
+            selector.referenced_objects = [bitmap]   # garde le buffer
+            selectors[doc_type] = selector
+    return selectors
+
+
+def search_params(index, selector):
+    """Paramètres de recherche avec sélecteur, réglages de tune_index conservés."""
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(
+            sel=selector, efSearch=index.hnsw.efSearch
+        )
+    if isinstance(index, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=index.nprobe)
+    return faiss.SearchParameters(sel=selector)
+
+
+def search_doc_type(vectorstore, queries, doc_type, k):
+    """
+    similarity_search_with_score(query, k, filter={"doc_type": doc_type})
+    pour chaque requête de `queries`, par sélecteur FAISS : requêtes
+    embeddées en un lot, une seule recherche FAISS multi-requêtes.
+    Sans bitmaps (index pas encore sauvegardé, ancien format) : filtre
+    LangChain, requête par requête. Une liste de résultats par requête.
+    """
+    # Cache de requêtes (QueryCachedEmbeddings) s'il y en a un ;
+    # sinon embed_documents = embed_query pour mpnet (pas de préfixe)
+    embeddings = vectorstore.embedding_function
+    embed = getattr(embeddings, 'embed_queries', embeddings.embed_documents)
+    vectors = np.array(embed(list(queries)), dtype=np.float32)
+
+    selectors = getattr(vectorstore, 'doc_type_selectors', None)
+    if not selectors:
+        return [
+            vectorstore.similarity_search_with_score_by_vector(
+                vector, k=k, filter={"doc_type": doc_type},
+            )
+            for vector in vectors
+        ]
+    if doc_type not in selectors:
+        return [[] for _ in vectors]
+
+    if vectorstore._normalize_L2:
+        faiss.normalize_L2(vectors)
+    scores, positions = vectorstore.index.search(
+        vectors, k,
+        params=search_params(vectorstore.index, selectors[doc_type]),
+    )
+
+    results = []
+    for row_scores, row_positions in zip(scores, positions):
+        hits = []
+        for score, pos in zip(row_scores, row_positions):
+            if pos == -1:
+                continue
+            doc_id = vectorstore.index_to_docstore_id[pos]
+            doc = vectorstore.docstore.search(doc_id)
+            if not isinstance(doc, Document):
+                raise ValueError(f"Document introuvable : {doc_id}")
+            hits.append((doc, score))
+        results.append(hits)
+    return results
@@ -0,0 +1,266 @@
+# embedding_cache.py
+"""
+Cache disque des embeddings, clé = hash du contenu, par modèle.
+
+<cache>/<modèle>/
+- vectors.f32 : matrice float32 (n, dim), lue en memmap
+- hashes.bin  : empreinte blake2b de chaque ligne, dans l'ordre
+- meta.json   : nom du modèle et dimension
+Un rebuild de l'index n'embedde que les chunks jamais vus ;
+les autres vecteurs sont relus depuis le cache.
+
+Requêtes (agent) : LRU borné en mémoire, texte normalisé → vecteur,
+persisté en option dans <cache>/<modèle>/queries.npz.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import re
+import threading
+import uuid
+import zipfile
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+DIGEST_SIZE = 16
+QUERY_CACHE_SIZE = 1024   # requêtes gardées (LRU)
+QUERY_CACHE_FILE = 'queries.npz'
+
+
+def content_hash(text):
+    return hashlib.blake2b(
+        text.encode('utf-8'), digest_size=DIGEST_SIZE
+    ).digest()
+
+
+def cache_dir(root, model_name):
+    return Path(root) / re.sub(r'[^\w.-]+', '__', model_name)
+
+
+def normalize_query(text):
+    """Espaces normalisés : même tokenisation, donc même vecteur."""
+    return " ".join(text.split())
+
+
+class EmbeddingCache:
+    """Matrice float32 en ajout seul + index empreinte → ligne."""
+
+    def __init__(self, root, model_name):
+        self.model_name = model_name
+        self.dir = cache_dir(root, model_name)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.vectors_file = self.dir / 'vectors.f32'
+        self.hashes_file = self.dir / 'hashes.bin'
+        self.meta_file = self.dir / 'meta.json'
+
+        self.dim = None
+        self.rows = {}
+        self._vectors = None
+        self._load()
+
+    def _load(self):
+        if not self.meta_file.exists():
+            return
+        meta = json.loads(self.meta_file.read_text(encoding='utf-8'))
+        self.dim = meta['dim']
+
+        digests = (
+            self.hashes_file.read_bytes()
+            if self.hashes_file.exists() else b''
+        )
+        row_bytes = self.dim * 4
+        n_vectors = (
+            self.vectors_file.stat().st_size // row_bytes
+            if self.vectors_file.exists() else 0
+        )
+        # Vecteurs écrits avant les empreintes : un arrêt brutal
+        # laisse au pire une fin de fichier orpheline, tronquée ici
+        n = min(len(digests) // DIGEST_SIZE, n_vectors)
+        for path, size in ((self.vectors_file, n * row_bytes),
+                           (self.hashes_file, n * DIGEST_SIZE)):
+            if path.exists() and path.stat().st_size != size:
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+
+        self.rows = {
+            digests[i * DIGEST_SIZE:(i + 1) * DIGEST_SIZE]: i
+            for i in range(n)
+        }
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, digest):
+        return digest in self.rows
+
+    def vectors(self):
+        """Matrice (n, dim) en memmap lecture seule."""
+        if self._vectors is None and self.rows:
+            self._vectors = np.memmap(
+                self.vectors_file, dtype=np.float32, mode='r',
+                shape=(len(self.rows), self.dim),
+            )
+        return self._vectors
+
+    def get(self, digests):
+        """Vecteurs (copie) des empreintes, toutes présentes."""
+        return self.vectors()[[self.rows[d] for d in digests]]
+
+    def add(self, digests, vectors):
+        """Ajoute des empreintes nouvelles (uniques) et leurs vecteurs."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            self.meta_file.write_text(
+                json.dumps({'model': self.model_name, 'dim': self.dim}),
+                encoding='utf-8',
+            )
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(
+                f"Dimension {vectors.shape[1]} ≠ {self.dim} "
+                f"dans le cache {self.dir}"
+            )
+
+        with open(self.vectors_file, 'ab') as f:
+            f.write(vectors.tobytes())
+        with open(self.hashes_file, 'ab') as f:
+            f.write(b''.join(digests))
+        for digest in digests:
+            self.rows[digest] = len(self.rows)
+        self._vectors = None
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings LangChain : embed_documents passe par le cache,
+    seuls les contenus absents sont calculés par `embeddings`.
+    """
+
+    def __init__(self, embeddings, cache):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts):
+        digests = [content_hash(text) for text in texts]
+
+        missing = {}
+        for text, digest in zip(texts, digests):
+            if digest not in self.cache and digest not in missing:
+                missing[digest] = text
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            self.cache.add(list(missing), vectors)
+
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+        return self.cache.get(digests).tolist()
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+
+class QueryCachedEmbeddings(Embeddings):
+    """
+    Embeddings LangChain : embed_query / embed_queries passent par un
+    LRU borné (texte normalisé → vecteur), partagé entre threads ;
+    une question déjà posée ne repasse pas par le modèle.
+    embed_documents (indexation) contourne le cache.
+    path : persistance optionnelle (.npz), relue à la création et
+    écrite à la sortie du processus.
+    """
+
+    def __init__(self, embeddings, size=QUERY_CACHE_SIZE, path=None):
+        self.embeddings = embeddings
+        self.size = size
+        self.path = Path(path) if path else None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        if self.path:
+            self._load()
+            atexit.register(self.save)
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with np.load(self.path) as data:
+                entries = [
+                    (str(query), vector.tolist())
+                    for query, vector in zip(data['queries'], data['vectors'])
+                ]
+        except (OSError, ValueError, KeyError, EOFError,
+                zipfile.BadZipFile) as e:
+            # Fichier illisible : cache vide, réécrit à la sortie
+            print(f"⚠️ Cache de requêtes ignoré ({self.path}) : {e}")
+            return
+        self._cache.update(entries)
+        while len(self._cache) > self.size:
+            self._cache.popitem(last=False)
+
+    def save(self):
+        """
+        Écrit le LRU (ordre conservé) : fichier temporaire propre à
+        l'appel, puis rename. Plusieurs agents sur un même hôte
+        sauvegardent sans s'entrelacer ; le dernier l'emporte.
+        """
+        with self._lock:
+            if not self._cache:
+                return
+            queries = np.array(list(self._cache))
+            vectors = np.array(list(self._cache.values()), dtype=np.float32)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(
+            f"{self.path.name}.{os.getpid()}-{uuid.uuid4().hex}.tmp"
+        )
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, queries=queries, vectors=vectors)
+            os.replace(tmp_path, self.path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def embed_queries(self, texts):
+        """Vecteurs de plusieurs requêtes ; absentes calculées en un lot."""
+        keys = [normalize_query(text) for text in texts]
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    found[key] = self._cache[key]
+
+        missing = list(dict.fromkeys(k for k in keys if k not in found))
+        if missing:
+            # embed_documents = embed_query pour mpnet (pas de préfixe)
+            vectors = self.embeddings.embed_documents(missing)
+            found.update(zip(missing, vectors))
+            with self._lock:
+                for key, vector in zip(missing, vectors):
+                    self._cache[key] = vector
+                    self._cache.move_to_end(key)
+                while len(self._cache) > self.size:
+                    self._cache.popitem(last=False)
+
+        with self._lock:
+            self.misses += len(missing)
+            self.hits += len(keys) - len(missing)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text):
+        return self.embed_queries([text])[0]
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    def print_stats(self):
+        print(f"  ♻️  Requêtes : {self.hits} en cache, "
+              f"{self.misses} calculées ({len(self._cache)} gardées)")
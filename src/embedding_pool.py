@@ -0,0 +1,169 @@
+# embedding_pool.py
+"""
+Lots d'embedding : buckets par longueur en tokens, en local ou
+répartis sur un pool de processus.
+
+Les textes sont triés par nombre de tokens et encodés par lots de
+batch_size textes de longueurs voisines : le padding au plus long
+du lot est minimal. L'ordre d'origine est restauré en sortie.
+
+Pool : chaque worker charge le modèle (create_index.get_embedding_model)
+avec un nombre fixe de threads intra-op, épinglés sur ses propres
+cœurs. Les workers reçoivent exactement les lots du chemin local
+(length_buckets) : chaque texte est encodé avec le même padding.
+Le nombre de threads intra-op diffère du processus local et change
+l'ordre des réductions flottantes : vecteurs égaux aux arrondis
+près, pas bit à bit (cosinus ≥ 0.9999, test_pool_parity.py).
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from tokens import count_tokens
+
+_model = None   # modèle du worker courant
+
+
+def _init_worker(threads, core_sets, backend):
+    global _model
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, core_sets.get())
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS'):
+        os.environ[var] = str(threads)
+
+    if backend == 'torch':
+        import torch
+
+        torch.set_num_threads(threads)
+
+    from create_index import get_embedding_model
+
+    _model = get_embedding_model(backend, threads=threads)
+
+
+def _embed_batch(args):
+    batch_no, texts = args
+    t0 = time.perf_counter()
+    vectors = _model.embed_documents(texts)
+    return batch_no, os.getpid(), vectors, time.perf_counter() - t0
+
+
+def length_buckets(texts, batch_size):
+    """Lots d'indices de textes, triés par nb de tokens décroissant."""
+    order = np.argsort(-np.asarray(count_tokens(texts)), kind='stable')
+    return [
+        order[start:start + batch_size]
+        for start in range(0, len(texts), batch_size)
+    ]
+
+
+def batch_size_of(embeddings):
+    return embeddings.encode_kwargs.get('batch_size', 32)
+
+
+class BucketedEmbeddings(Embeddings):
+    """embed_documents par buckets de longueur (index et requêtes en masse)."""
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.batch_size = batch_size_of(embeddings)
+
+    def embed_documents(self, texts):
+        if len(texts) <= self.batch_size:
+            return self.embeddings.embed_documents(texts)
+        vectors = [None] * len(texts)
+        for idx in length_buckets(texts, self.batch_size):
+            batch_vectors = self.embeddings.embed_documents(
+                [texts[i] for i in idx]
+            )
+            for i, vector in zip(idx, batch_vectors):
+                vectors[i] = vector
+        return vectors
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+
+def core_groups(workers):
+    """Cœurs disponibles répartis en `workers` groupes disjoints."""
+    if hasattr(os, 'sched_getaffinity'):
+        cores = sorted(os.sched_getaffinity(0))
+    else:
+        cores = list(range(os.cpu_count() or 1))
+    per_worker = max(1, len(cores) // workers)
+    return [
+        cores[i * per_worker:(i + 1) * per_worker] or cores
+        for i in range(workers)
+    ]
+
+
+class ParallelEmbeddings(Embeddings):
+    """
+    Répartit embed_documents sur un pool de processus ; les
+    requêtes et les petits appels restent dans `embeddings`.
+    """
+
+    def __init__(self, embeddings, workers, backend='torch'):
+        self.embeddings = embeddings
+        self.workers = workers
+        self.backend = backend
+        self.batch_size = batch_size_of(embeddings)
+        self.stats = {}   # pid → [docs, secondes]
+        self._pool = None
+
+    def _start(self):
+        ctx = multiprocessing.get_context('spawn')
+        groups = core_groups(self.workers)
+        core_sets = ctx.Queue()
+        for group in groups:
+            core_sets.put(set(group))
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(len(groups[0]), core_sets, self.backend),
+        )
+
+    def embed_documents(self, texts):
+        if len(texts) <= self.batch_size:
+            return self.embeddings.embed_documents(texts)
+        if self._pool is None:
+            self._start()
+
+        # Mêmes lots que BucketedEmbeddings
+        slices = length_buckets(texts, self.batch_size)
+        batches = [
+            (batch_no, [texts[i] for i in idx])
+            for batch_no, idx in enumerate(slices)
+        ]
+
+        vectors = [None] * len(texts)
+        for batch_no, pid, batch_vectors, seconds in self._pool.map(
+            _embed_batch, batches
+        ):
+            for i, vector in zip(slices[batch_no], batch_vectors):
+                vectors[i] = vector
+            docs_seconds = self.stats.setdefault(pid, [0, 0.0])
+            docs_seconds[0] += len(batch_vectors)
+            docs_seconds[1] += seconds
+        return vectors
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+    def print_stats(self):
+        for n, (pid, (docs, seconds)) in enumerate(
+            sorted(self.stats.items())
+        ):
+            print(f"  ⚙️  Worker {n} (pid {pid}) : {docs} docs, "
+                  f"{docs / max(seconds, 1e-9):.1f} docs/s")
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -0,0 +1,64 @@
+# eval_questions.py
+"""
+Questions de test CTI partagées par les diagnostics
+(test_scores.py, test_rag_final.py) et les benchmarks.
+"""
+
+SCORE_QUESTIONS = [
+    "cracking tools",
+    "stolen credentials",
+    "cloud logs",
+    "pirated software",
+    "hacking tutorial",
+    "combo list mail pass",
+    "carding credit card",
+    "malware android",
+]
+
+ON_TOPIC = [
+    {
+        "question": "What cracking tools are shared?",
+        "expected_post": "573",
+        "expected_channel": "hackingandcrackingtools",
+    },
+    {
+        "question": "What are dark method cloud logs?",
+        "expected_post": "381",
+        "expected_channel": "hackingandcrackingtools",
+    },
+    {
+        "question": "What cloud logs are available?",
+        "expected_post": None,
+        "expected_channel": None,
+    },
+    {
+        "question": "What stolen credentials are sold?",
+        "expected_post": None,
+        "expected_channel": None,
+    },
+    {
+        "question": "What pirated software is shared?",
+        "expected_post": None,
+        "expected_channel": None,
+    },
+    {
+        "question": "combo list mail pass",
+        "expected_post": None,
+        "expected_channel": None,
+    },
+    {
+        "question": "carding credit card stolen",
+        "expected_post": None,
+        "expected_channel": None,
+    },
+    {
+        "question": "android malware telegram",
+        "expected_post": None,
+        "expected_channel": None,
+    },
+]
+
+# Toutes les questions de recherche, sans doublon
+RETRIEVAL_QUESTIONS = list(dict.fromkeys(
+    SCORE_QUESTIONS + [test["question"] for test in ON_TOPIC]
+))
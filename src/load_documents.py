@@ -1,201 +1,336 @@
 # 1_load_documents.py
+import bisect
+import itertools
 import json
 import re
 from pathlib import Path
 from langchain_core.documents import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 
-JSONL_PATH = Path('darkgram_cti_final.jsonl')
+from corpus import (
+    extract_content, extract_ids, has_corpus, iter_corpus_records,
+    open_text, resolve_jsonl,
+)
 
+from dedup import DEDUP_PATH, dedup_is_fresh
+from tokens import MODEL_MAX_TOKENS, encode_texts, special_tokens_count
 
-def extract_content(text):
-    """Extrait UNIQUEMENT le contenu après CONTENT:"""
-    match = re.search(r'CONTENT:\s*(.+)$', text, re.DOTALL)
-    if match:
-        return match.group(1).strip()
-    return text.strip()
+JSONL_PATH = Path('darkgram_cti_final.jsonl')
 
 
-def load_documents():
-    """Charge le JSONL → Documents LangChain."""
-    print("📄 Chargement du JSONL...")
+def corpus_source():
+    """Corpus dédupliqué (dedup.py) s'il est à jour, sinon l'ingestion."""
+    if dedup_is_fresh(JSONL_PATH, DEDUP_PATH):
+        print("  🧬 Corpus dédupliqué")
+        return DEDUP_PATH
+    return JSONL_PATH
 
-    documents = []
-    stats = {'loaded': 0, 'empty': 0, 'url': 0}
 
-    with open(JSONL_PATH, 'r', encoding='utf-8') as f:
+def iter_raw_records():
+    """(contenu, métadonnées, post_id, reply_id) depuis le corpus."""
+    source = corpus_source()
+    if has_corpus(source):
+        print("  🧱 Lecture du corpus Parquet")
+        for rec in iter_corpus_records(source):
+            yield (
+                rec['content'], rec['metadata'],
+                rec['post_id'], rec['reply_id'],
+            )
+        return
+
+    with open_text(resolve_jsonl(source)) as f:
         for line in f:
             obj = json.loads(line.strip())
             raw_text = obj.get('text', '')
-            metadata = obj.get('metadata', {})
-
-            content = extract_content(raw_text)
-
-            if not content:
-                stats['empty'] += 1
-                continue
-
-            if re.match(r'^https?://\S+$', content.strip()):
-                stats['url'] += 1
-                continue
-
-            clean_meta = {}
-            for k, v in metadata.items():
-                if v is None:
-                    clean_meta[k] = ""
-                elif isinstance(v, (str, int, float, bool)):
-                    clean_meta[k] = v
-                else:
-                    clean_meta[k] = str(v)
-
-            # clean_meta["full_structured_text"] = raw_text # ❌ SUPPRIMER
-            # Extraire post_id et reply_id depuis le texte structuré
-            match_post = re.search(r'\[POST_ID:\s*(\d+)\]', raw_text)
-            match_parent = re.search(r'\[PARENT_POST_ID:\s*(\d+)\]', raw_text)
-            match_reply = re.search(r'\[REPLY_ID:\s*(\d+)\]', raw_text)
-
-            clean_meta["post_id"] = match_post.group(1) if match_post else ""
-            if match_parent:
-                  clean_meta["post_id"] = match_parent.group(1)
-            clean_meta["reply_id"] = match_reply.group(1) if match_reply else ""
-
-            documents.append(
-                Document(
-                    page_content=content,
-                    metadata=clean_meta,
-                )
+            post_id, reply_id = extract_ids(raw_text)
+            yield (
+                extract_content(raw_text), obj.get('metadata', {}),
+                post_id, reply_id,
             )
-            stats['loaded'] += 1
 
+
+def iter_documents(stats):
+    """Corpus → Documents LangChain, un par un."""
+    for content, metadata, post_id, reply_id in iter_raw_records():
+        if not content:
+            stats['empty'] += 1
+            continue
+
+        if re.match(r'^https?://\S+$', content.strip()):
+            stats['url'] += 1
+            continue
+
+        clean_meta = {}
+        for k, v in metadata.items():
+            if v is None:
+                clean_meta[k] = ""
+            elif isinstance(v, (str, int, float, bool)):
+                clean_meta[k] = v
+            else:
+                clean_meta[k] = str(v)
+
+        # post_id / reply_id extraits du texte structuré
+        clean_meta["post_id"] = post_id
+        clean_meta["reply_id"] = reply_id
+
+        stats['loaded'] += 1
+        yield Document(
+            page_content=content,
+            metadata=clean_meta,
+        )
+
+
+def print_load_stats(stats):
     print(f"  ✅ Chargés  : {stats['loaded']}")
     print(f"  ⏭️  Vides   : {stats['empty']}")
     print(f"  🔗 URL-only : {stats['url']}")
 
+
+def load_documents():
+    """Charge le corpus (Parquet si dispo, sinon JSONL) → Documents."""
+    print("📄 Chargement du corpus...")
+    stats = {'loaded': 0, 'empty': 0, 'url': 0}
+    documents = list(iter_documents(stats))
+    print_load_stats(stats)
     return documents
 
 
+def is_spam(doc):
+    """Spam = URLs répétées."""
+    content = doc.page_content
+    urls = re.findall(r'https?://\S+', content)
+    if not urls:
+        return False
+
+    unique_urls = set(urls)
+    if len(urls) >= 3 and len(unique_urls) == 1:
+        return True
+
+    text_no_urls = re.sub(
+        r'https?://\S+', '', content
+    ).strip()
+    return (
+        len(urls) >= 5
+        and len(text_no_urls) < len(content) * 0.2
+    )
+
+
+def iter_filter_spam(documents, stats):
+    for doc in documents:
+        if is_spam(doc):
+            stats['spam'] += 1
+            continue
+        yield doc
+
+
 def filter_spam_content(documents):
     """Supprime le spam (URLs répétées)."""
-    filtered = []
-    removed = 0
+    stats = {'spam': 0}
+    filtered = list(iter_filter_spam(documents, stats))
 
-    for doc in documents:
-        content = doc.page_content
-        urls = re.findall(r'https?://\S+', content)
-
-        if urls:
-            unique_urls = set(urls)
-            if len(urls) >= 3 and len(unique_urls) == 1:
-                removed += 1
-                continue
-
-            text_no_urls = re.sub(
-                r'https?://\S+', '', content
-            ).strip()
-            if (
-                len(urls) >= 5
-                and len(text_no_urls) < len(content) * 0.2
-            ):
-                removed += 1
-                continue
-
-        filtered.append(doc)
-
-    print(f"  🗑️  Spam supprimé : {removed}")
+    print(f"  🗑️  Spam supprimé : {stats['spam']}")
     print(f"  📄 Restants      : {len(filtered)}")
 
     return filtered
 
 
-def smart_split(documents, max_tokens=300):
+def new_split_stats():
+    return {'short': 0, 'long': 0, 'chunks': 0, 'total': 0}
+
+
+# Séparateurs préférés pour couper, du plus fort au plus faible
+SEPARATORS = ["\n\n", "\n", " | ", "  ", " "]
+OVERLAP = 0.15
+
+
+def best_cut(text, starts, offsets, word_ids, lo, hi):
+    """
+    (j, entre_mots) : token j (lo ≤ j ≤ hi) avant lequel couper,
+    au dernier séparateur le plus fort entre deux tokens de la
+    fenêtre, sinon à la dernière frontière de mot, sinon à hi,
+    au milieu d'un mot (entre_mots=False).
     """
-    Split basé sur le VRAI comptage de tokens,
-    pas sur l'approximation caractères.
+    window_start = offsets[lo - 1][1]
+    window_end = starts[hi]
+    for sep in SEPARATORS:
+        pos = text.rfind(sep, window_start, window_end + len(sep) - 1)
+        if pos != -1:
+            return bisect.bisect_right(starts, pos), True
+    for j in range(hi, lo - 1, -1):
+        if word_ids[j] != word_ids[j - 1]:
+            return j, True
+    return hi, False
+
+
+def token_chunks(text, encoding, max_tokens, overlap):
     """
-    from transformers import AutoTokenizer
+    Découpe `text` en chunks d'au plus `max_tokens` tokens, sur
+    les offsets de son encodage (une seule tokenisation). Chaque
+    coupe tombe sur le meilleur séparateur de la seconde moitié
+    de la fenêtre ; le chunk suivant reprend ~`overlap` tokens
+    plus tôt, au début d'un mot.
+    Renvoie des (chunk, entre_mots) : entre_mots=False quand la
+    fenêtre n'a ni séparateur ni frontière de mot (blob base64 /
+    hex) et que le chunk commence ou finit dans un mot ; sa
+    re-tokenisation peut différer (voir fit_chunk).
+    """
+    offsets = encoding.offsets
+    word_ids = encoding.word_ids
+    starts = [start for start, _ in offsets]
+    n = len(offsets)
+
+    chunks = []
+    start, starts_word = 0, True
+    while True:
+        if n - start <= max_tokens:
+            end, ends_word = n, True
+        else:
+            end, ends_word = best_cut(
+                text, starts, offsets, word_ids,
+                lo=start + max(max_tokens // 2, overlap + 1),
+                hi=start + max_tokens,
+            )
+        chunks.append((
+            text[starts[start]:offsets[end - 1][1]],
+            starts_word and ends_word,
+        ))
+        if end == n:
+            return chunks
+
+        # Reprise : 1er blanc de la zone d'overlap, sinon 1er mot,
+        # sinon en plein mot
+        window = range(end - overlap, end)
+        start = next(
+            (j for j in window if starts[j] > offsets[j - 1][1]),
+            next(
+                (j for j in window if word_ids[j] != word_ids[j - 1]),
+                None,
+            ),
+        )
+        starts_word = start is not None
+        if not starts_word:
+            start = end - overlap
 
-    tokenizer = AutoTokenizer.from_pretrained(
-        "sentence-transformers/all-mpnet-base-v2"
-    )
 
-    # Taille en CARACTÈRES ajustée pour le contenu CTI
-    # Ratio réel : ~2.5 car/token pour URLs/IPs
-    MAX_CHARS = max_tokens * 2  # 600 car au lieu de 1200
+def fit_chunk(chunk, max_tokens, overlap):
+    """
+    Chunk coupé en plein mot, re-tokenisé : une 1re pièce « ## »
+    redevient un début de mot et peut prendre plus de tokens.
+    Au-delà de `max_tokens`, recoupé (récursivement, chaque
+    morceau est plus court) : texte couvert en entier.
+    """
+    encoding = next(encode_texts([chunk]))
+    if len(encoding) <= max_tokens:
+        return [chunk]
+    fitted = []
+    for piece, between_words in token_chunks(
+        chunk, encoding, max_tokens, overlap
+    ):
+        if between_words:
+            fitted.append(piece)
+        else:
+            fitted.extend(fit_chunk(piece, max_tokens, overlap))
+    return fitted
+
 
-    short_docs = []
-    long_docs = []
+def split_batch(documents, stats, max_tokens=300):
+    """
+    Split sur les offsets de tokens : chaque document est
+    tokenisé une seule fois (par lot) et les longs sont coupés
+    aux frontières de tokens, overlap de 15%. Un chunk coupé
+    entre deux mots se re-tokenise à l'identique : il tient
+    dans max_tokens (≤ 384) sans re-vérification. Seuls les
+    chunks coupés en plein mot (blobs sans séparateur) sont
+    re-tokenisés et recoupés s'ils dépassent (fit_chunk).
+    Traite un lot de documents ; met à jour `stats`.
+    """
+    n_special = special_tokens_count()
+    if max_tokens > MODEL_MAX_TOKENS:
+        raise ValueError(
+            f"max_tokens={max_tokens} > limite du modèle "
+            f"({MODEL_MAX_TOKENS})"
+        )
+    budget = max_tokens - n_special
+    overlap = int(budget * OVERLAP)
+
+    total = []
+    encodings = encode_texts(doc.page_content for doc in documents)
+    for doc, encoding in zip(documents, encodings):
+        if len(encoding) <= budget:
+            doc.metadata["was_split"] = False
+            stats['short'] += 1
+            total.append(doc)
+            continue
+
+        stats['long'] += 1
+        for chunk, between_words in token_chunks(
+            doc.page_content, encoding, budget, overlap
+        ):
+            pieces = (
+                [chunk] if between_words
+                else fit_chunk(chunk, budget, overlap)
+            )
+            for piece in pieces:
+                total.append(Document(
+                    page_content=piece,
+                    metadata={**doc.metadata, "was_split": True},
+                ))
+                stats['chunks'] += 1
+
+    stats['total'] += len(total)
+    return total
 
-    for doc in documents:
-        tok_count = len(tokenizer.encode(doc.page_content))
-        if tok_count > max_tokens:
-            long_docs.append(doc)
-        else:
-            short_docs.append(doc)
 
+def print_split_stats(stats, max_tokens=300):
     print(f"\n📏 Longueurs (comptage RÉEL tokens) :")
     print(f"  Seuil  : {max_tokens} tokens")
-    print(f"  Courts : {len(short_docs)}")
-    print(f"  Longs  : {len(long_docs)}")
+    print(f"  Courts : {stats['short']}")
+    print(f"  Longs  : {stats['long']} → {stats['chunks']} chunks")
+    print(f"  📦 Total final : {stats['total']}")
 
-    if not long_docs:
-        for doc in short_docs:
-            doc.metadata["was_split"] = False
-        return short_docs
-
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=MAX_CHARS,           # 600 car ≈ 300 tokens CTI
-        chunk_overlap=int(MAX_CHARS * 0.15),  # 90 car overlap
-        separators=["\n\n", "\n", " | ", "  ", " "],
-        keep_separator=True,
-        strip_whitespace=True,
-    )
 
-    split_docs = splitter.split_documents(long_docs)
+def smart_split(documents, max_tokens=300):
+    """Split token-aware d'une liste complète de documents."""
+    stats = new_split_stats()
+    total = split_batch(documents, stats, max_tokens=max_tokens)
+    print_split_stats(stats, max_tokens=max_tokens)
+    return total
+
 
-    # VÉRIFICATION : re-check les splits
-    still_long = []
-    ok_docs = []
+# ══════════════════════════════════════════════
+# PIPELINE EN FLUX
+# ══════════════════════════════════════════════
+# load → spam → split en générateurs : seul un lot de
+# BATCH_SIZE documents (et ses chunks) vit en mémoire,
+# au lieu de trois copies du corpus.
 
-    for doc in split_docs:
-        tok = len(tokenizer.encode(doc.page_content))
-        if tok > 384:
-            still_long.append(doc)
-        else:
-            ok_docs.append(doc)
-
-    # Les irréductibles : forcer un split plus agressif
-    if still_long:
-        print(f"  ⚠️  {len(still_long)} chunks encore trop longs")
-        aggressive_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=350,       # ~175 tokens, très conservateur
-            chunk_overlap=50,
-            separators=["\n", " ", ""],  # Coupe partout si nécessaire
-            keep_separator=False,
-            strip_whitespace=True,
-        )
-        forced_splits = aggressive_splitter.split_documents(
-            still_long
-        )
-        ok_docs.extend(forced_splits)
-        print(f"  🔄 Re-split → {len(forced_splits)} chunks")
+BATCH_SIZE = 2048
 
-    for doc in ok_docs:
-        doc.metadata["was_split"] = True
-    for doc in short_docs:
-        doc.metadata["was_split"] = False
 
-    total = short_docs + ok_docs
-    print(f"  📦 Total final : {len(total)}")
+def iter_prepared_batches(batch_size=BATCH_SIZE, max_tokens=300):
+    """Lots de Documents prêts à indexer (load → spam → split)."""
+    print("📄 Chargement du corpus (flux)...")
+    load_stats = {'loaded': 0, 'empty': 0, 'url': 0, 'spam': 0}
+    split_stats = new_split_stats()
 
-    return total
+    docs = iter_filter_spam(iter_documents(load_stats), load_stats)
+    while True:
+        batch = list(itertools.islice(docs, batch_size))
+        if not batch:
+            break
+        yield split_batch(batch, split_stats, max_tokens=max_tokens)
+
+    print_load_stats(load_stats)
+    print(f"  🗑️  Spam supprimé : {load_stats['spam']}")
+    print_split_stats(split_stats, max_tokens=max_tokens)
 
 
 def load_and_prepare():
     """Pipeline complet."""
-    docs = load_documents()
-    docs = filter_spam_content(docs)
-    docs = smart_split(docs, max_tokens=300)
-    return docs
+    return [
+        doc
+        for batch in iter_prepared_batches(max_tokens=300)
+        for doc in batch
+    ]
 
 
 if __name__ == "__main__":
@@ -206,4 +341,4 @@ if __name__ == "__main__":
         print(f"  Split : {doc.metadata.get('was_split')}")
         print(f"  Len   : {len(doc.page_content)} car.")
         print(f"  Text  : {doc.page_content[:80]}...")
-        print()
\ No newline at end of file
+        print()
@@ -1,18 +1,21 @@
 # main.py
 from pathlib import Path
-from load_documents import load_and_prepare
-from create_index import create_index, load_index, FAISS_INDEX_PATH
+from load_documents import iter_prepared_batches
+from create_index import (
+    create_index_from_batches, load_index, FAISS_INDEX_PATH,
+)
 from rag_chain import CTIAgent
 
 
 def main():
     # ── Index ──
     if FAISS_INDEX_PATH.exists():
-        vectorstore = load_index()
+        vectorstore = load_index(mmap=True)
     else:
         print("🔨 Première exécution : création de l'index")
-        docs = load_and_prepare()
-        vectorstore = create_index(docs)
+        vectorstore = create_index_from_batches(
+            iter_prepared_batches()
+        )
 
     # ── Agent ──
     agent = CTIAgent(vectorstore)
@@ -31,19 +34,24 @@ def main():
         if not question:
             continue
 
-        result = agent.analyze(question, k=10, verbose=True)
-
+        # Sources dès la fin du retrieval, puis l'analyse au fil
+        # de la génération
+        for kind, payload in agent.analyze_stream(
+            question, k=10, verbose=True
+        ):
+            if kind == "sources":
+                print("\n📌 Sources :")
+                for s in payload:
+                    print(
+                        f"  POST {s['post_id']} | "
+                        f"{s['channel']} | "
+                        f"Score: {s['score']:.3f} | "
+                        f"Replies: {s['replies']}"
+                    )
+                print("\n" + "─" * 50)
+            elif kind == "token":
+                print(payload, end="", flush=True)
         print("\n" + "─" * 50)
-        print(result["analysis"])
-        print("─" * 50)
-        print("\n📌 Sources :")
-        for s in result["sources"]:
-            print(
-                f"  POST {s['post_id']} | "
-                f"{s['channel']} | "
-                f"Score: {s['score']:.3f} | "
-                f"Replies: {s['replies']}"
-            )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,149 @@
+# onnx_embeddings.py
+"""
+Backend d'embedding ONNX Runtime pour all-mpnet-base-v2 (CPU).
+
+Le modèle est exporté une fois (torch.onnx) dans ONNX_MODEL_PATH,
+puis quantifié en int8 dynamique (onnxruntime.quantization) pour
+la variante 'onnx-int8'. L'inférence ne dépend que d'onnxruntime
+et du tokenizer rapide : mean pooling + normalisation L2, comme
+sentence-transformers.
+"""
+
+from pathlib import Path
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from tokens import MODEL_MAX_TOKENS, MODEL_NAME, get_tokenizer
+
+try:
+    import onnxruntime as ort
+except ImportError:  # Backend ONNX optionnel
+    ort = None
+
+ONNX_MODEL_PATH = Path('onnx_models') / MODEL_NAME.split('/')[-1]
+FP32_FILE = 'model.onnx'
+INT8_FILE = 'model.int8.onnx'
+
+
+def export_onnx(model_dir=ONNX_MODEL_PATH):
+    """Export fp32 du transformer (sans pooling), axes dynamiques."""
+    import torch
+    from transformers import AutoModel
+
+    class Encoder(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            return self.model(
+                input_ids=input_ids, attention_mask=attention_mask
+            ).last_hidden_state
+
+    model_dir = Path(model_dir)
+    model_dir.mkdir(parents=True, exist_ok=True)
+    encoder = Encoder(AutoModel.from_pretrained(MODEL_NAME)).eval()
+    sample = get_tokenizer()(["export onnx"], return_tensors='pt')
+    dynamic = {0: 'batch', 1: 'sequence'}
+
+    print(f"  📤 Export ONNX : {model_dir / FP32_FILE}")
+    with torch.no_grad():
+        torch.onnx.export(
+            encoder,
+            (sample['input_ids'], sample['attention_mask']),
+            str(model_dir / FP32_FILE),
+            input_names=['input_ids', 'attention_mask'],
+            output_names=['last_hidden_state'],
+            dynamic_axes={
+                'input_ids': dynamic,
+                'attention_mask': dynamic,
+                'last_hidden_state': dynamic,
+            },
+            opset_version=14,
+        )
+
+
+def quantize_onnx(model_dir=ONNX_MODEL_PATH):
+    """Quantification dynamique int8 des poids (MatMul/Gemm)."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    model_dir = Path(model_dir)
+    print(f"  🗜️  Quantification int8 : {model_dir / INT8_FILE}")
+    quantize_dynamic(
+        str(model_dir / FP32_FILE),
+        str(model_dir / INT8_FILE),
+        weight_type=QuantType.QInt8,
+    )
+
+
+def onnx_model_file(quantized=False, model_dir=ONNX_MODEL_PATH):
+    """Chemin du modèle ONNX, exporté / quantifié au besoin."""
+    model_dir = Path(model_dir)
+    if not (model_dir / FP32_FILE).exists():
+        export_onnx(model_dir)
+    if quantized and not (model_dir / INT8_FILE).exists():
+        quantize_onnx(model_dir)
+    return model_dir / (INT8_FILE if quantized else FP32_FILE)
+
+
+class OnnxEmbeddings(Embeddings):
+    """Embeddings LangChain servis par ONNX Runtime (CPU)."""
+
+    def __init__(self, quantized=False, threads=None, batch_size=64):
+        if ort is None:
+            raise ImportError("onnxruntime requis pour le backend ONNX")
+        self.quantized = quantized
+        self.encode_kwargs = {'batch_size': batch_size}
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = (
+            ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        )
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            str(onnx_model_file(quantized)),
+            options,
+            providers=['CPUExecutionProvider'],
+        )
+        self.tokenizer = get_tokenizer()
+
+    def _embed_batch(self, texts):
+        encoded = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=MODEL_MAX_TOKENS,
+            return_attention_mask=True,
+            return_token_type_ids=False,
+            return_tensors='np',
+        )
+        input_ids = encoded['input_ids'].astype(np.int64)
+        attention_mask = encoded['attention_mask'].astype(np.int64)
+        hidden = self.session.run(None, {
+            'input_ids': input_ids,
+            'attention_mask': attention_mask,
+        })[0]
+
+        # Mean pooling sur les tokens réels, puis norme L2
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(
+            mask.sum(axis=1), 1e-9, None
+        )
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+    def embed_documents(self, texts):
+        # Même pré-traitement que HuggingFaceEmbeddings
+        texts = [text.replace("\n", " ") for text in texts]
+        batch_size = self.encode_kwargs['batch_size']
+        vectors = []
+        for start in range(0, len(texts), batch_size):
+            vectors.extend(
+                self._embed_batch(texts[start:start + batch_size]).tolist()
+            )
+        return vectors
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
@@ -1,15 +1,39 @@
 import pandas as pd
+import numpy as np
+from pandas.api.types import infer_dtype
+import contextlib
+import hashlib
+import itertools
 import json
+import os
 import re
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+from corpus import (
+    compression_of, has_corpus, open_text, strip_compression,
+    write_corpus,
+)
+
 # ══════════════════════════════════════════════
 # CONFIGURATION
 # ══════════════════════════════════════════════
 
 DATA_ROOT = Path('cleaned_data')
+# Suffixe .zst ou .gz (ex. darkgram_cti_final.jsonl.zst) : compressé
 OUTPUT_FILE = Path('darkgram_cti_final.jsonl')
 
+# Processus d'ingestion (1 = séquentiel)
+WORKERS = os.cpu_count() or 1
+
+# Lignes par bloc pour les gros CSV de posts (None = tout en RAM)
+CHUNK_ROWS = 50_000
+# Seuls les CSV plus gros sont lus par blocs (2 passes : dtypes puis
+# lecture) ; les petits canaux restent en une seule lecture
+CHUNK_MIN_BYTES = 64 * 1024 * 1024
+
 # Table 1 : Posts (30 champs utiles, sans "channel id")
 POST_META_SCHEMA = [
     'url', 'date', 'views', 'forwards', 'replies',
@@ -103,197 +127,586 @@ def build_metadata(row, schema, extras):
     return meta
 
 
+def to_jsonl_line(text, metadata):
+    return json.dumps(
+        {"text": text, "metadata": metadata},
+        ensure_ascii=False
+    ) + '\n'
+
+
+def normalize_columns(df):
+    df.rename(columns=lambda x: x.strip().lower(), inplace=True)
+    return df
+
+
+def read_channel_csv(path):
+    return normalize_columns(pd.read_csv(path, low_memory=False))
+
+
+# ══════════════════════════════════════════════
+# LECTURE PAR BLOCS (CSV de plusieurs Go)
+# ══════════════════════════════════════════════
+# pandas infère les dtypes bloc par bloc : une colonne
+# "views" peut être int64 dans un bloc et float64 (NaN)
+# dans un autre, d'où "5" vs "5.0" dans le JSON.
+# Une 1ère passe relève le type de chaque colonne dans
+# chaque bloc pour retrouver le dtype qu'aurait donné
+# une lecture complète du fichier.
+
+KIND_BY_INFERRED = {
+    'boolean': 'bool',
+    'integer': 'int',
+    'floating': 'float',
+    'mixed-integer-float': 'float',
+}
+
+
+def dtype_kind(series):
+    if series.isna().all():
+        return None
+    return KIND_BY_INFERRED.get(
+        infer_dtype(series, skipna=True), 'object'
+    )
+
+
+def reconcile_dtype(kinds, has_nan, object_dtype):
+    """
+    Renvoie ('read', dtype) à imposer au parseur,
+    ('cast', dtype) à appliquer après lecture, ou None.
+    """
+    if not kinds:
+        return None
+    if kinds <= {'int', 'float'}:
+        if 'float' in kinds or has_nan:
+            return ('cast', 'float64')
+        return None
+    if kinds == {'bool'}:
+        return ('cast', object) if has_nan else None
+    if kinds == {'object'}:
+        return ('cast', object_dtype)
+    # Mélange texte / nombres : lecture complète = chaînes brutes
+    return ('read', str)
+
+
+def infer_csv_dtypes(path, chunk_rows):
+    kinds = {}
+    has_nan = {}
+    object_dtypes = {}
+    for chunk in pd.read_csv(path, chunksize=chunk_rows,
+                             low_memory=False):
+        for col in chunk.columns:
+            series = chunk[col]
+            kind = dtype_kind(series)
+            col_kinds = kinds.setdefault(col, set())
+            if kind is not None:
+                col_kinds.add(kind)
+            if kind == 'object':
+                object_dtypes[col] = series.dtype
+            has_nan[col] = has_nan.get(col, False) or series.hasnans
+
+    read_dtypes, casts = {}, {}
+    for col, col_kinds in kinds.items():
+        rule = reconcile_dtype(
+            col_kinds, has_nan[col], object_dtypes.get(col)
+        )
+        if rule is None:
+            continue
+        target = read_dtypes if rule[0] == 'read' else casts
+        target[col] = rule[1]
+    return read_dtypes, casts
+
+
+def iter_csv_chunks(path, chunk_rows=CHUNK_ROWS):
+    """
+    Lit un CSV par blocs de `chunk_rows` lignes, avec
+    les mêmes dtypes qu'une lecture complète.
+    """
+    read_dtypes, casts = infer_csv_dtypes(path, chunk_rows)
+    reader = pd.read_csv(
+        path, chunksize=chunk_rows, low_memory=False,
+        dtype=read_dtypes or None,
+    )
+    for chunk in reader:
+        for col, dtype in casts.items():
+            chunk[col] = chunk[col].astype(dtype)
+        yield normalize_columns(chunk)
+
+
+# ══════════════════════════════════════════════
+# MODE COLONNES (sans iterrows)
+# ══════════════════════════════════════════════
+# df.values renvoie exactement les scalaires que
+# df.iterrows() aurait fournis (même upcast de dtype),
+# ce qui garantit une sortie identique au mode ligne.
+
+def column_index(df):
+    """Nom de colonne → position (1ère occurrence)."""
+    index = {}
+    for i, col in enumerate(df.columns):
+        index.setdefault(col, i)
+    return index
+
+
+def column_values(values, index, name):
+    if name not in index:
+        return [None] * len(values)
+    return values[:, index[name]]
+
+
+def clean_column(col):
+    """clean_val() appliqué à une colonne entière."""
+    if isinstance(col, list):
+        return list(col)
+    mask = pd.isna(col)
+    out = col.tolist()  # numpy → types Python natifs
+    for i in np.flatnonzero(mask):
+        out[i] = None
+    if col.dtype == object:
+        out = [
+            v.item() if hasattr(v, 'item') else v
+            for v in out
+        ]
+    return out
+
+
+def build_metadata_columns(values, index, schema, extras):
+    cols = [
+        clean_column(column_values(values, index, field))
+        for field in schema
+    ]
+    metas = []
+    for row_vals in zip(*cols):
+        meta = dict(zip(schema, row_vals))
+        meta.update(extras)
+        metas.append(meta)
+    return metas
+
+
+# ══════════════════════════════════════════════
+# POSTS & REPLIES → LIGNES JSONL
+# ══════════════════════════════════════════════
+
+def post_lines_rows(df, category, channel_name,
+                    processed_ids, counters):
+    """Mode historique : une itération Python par ligne."""
+    for _, row in df.iterrows():
+        p_id = id_to_str(
+            row.get('post id')
+            or row.get('id')
+        )
+        if not p_id:
+            counters['skipped'] += 1
+            continue
+
+        content = safe_content(row.get('message'))
+        text = build_post_text(
+            post_id=p_id,
+            channel=channel_name,
+            content=content,
+        )
+        metadata = build_metadata(
+            row=row,
+            schema=POST_META_SCHEMA,
+            extras={
+                "category": category,
+                "doc_type": "original_post",
+                "channel_name": channel_name,
+                "recovered": False,
+            }
+        )
+        yield to_jsonl_line(text, metadata)
+        processed_ids.add(p_id)
+        counters['posts'] += 1
+
+
+def post_lines_columnar(df, category, channel_name,
+                        processed_ids, counters):
+    """Même sortie que post_lines_rows, colonne par colonne."""
+    values = df.values
+    index = column_index(df)
+
+    post_ids = column_values(values, index, 'post id')
+    ids = column_values(values, index, 'id')
+    p_ids = [id_to_str(a or b) for a, b in zip(post_ids, ids)]
+    contents = [
+        safe_content(v)
+        for v in column_values(values, index, 'message')
+    ]
+    metas = build_metadata_columns(
+        values, index, POST_META_SCHEMA,
+        extras={
+            "category": category,
+            "doc_type": "original_post",
+            "channel_name": channel_name,
+            "recovered": False,
+        }
+    )
+
+    lines = []
+    for p_id, content, metadata in zip(p_ids, contents, metas):
+        if not p_id:
+            counters['skipped'] += 1
+            continue
+        text = build_post_text(
+            post_id=p_id,
+            channel=channel_name,
+            content=content,
+        )
+        lines.append(to_jsonl_line(text, metadata))
+        processed_ids.add(p_id)
+    counters['posts'] += len(lines)
+    return lines
+
+
+def recovered_post_line(row0, parent_id, category, channel_name):
+    content = safe_content(row0.get('message'))
+    text_rec = build_post_text(
+        post_id=parent_id,
+        channel=channel_name,
+        content=content,
+    )
+    meta_rec = build_metadata(
+        row=row0,
+        schema=REPLY_META_SCHEMA,
+        extras={
+            "category": category,
+            "doc_type": "original_post",
+            "channel_name": channel_name,
+            "recovered": True,
+        }
+    )
+    return to_jsonl_line(text_rec, meta_rec)
+
+
+def reply_extras(category, parent_id, channel_name):
+    return {
+        "category": category,
+        "doc_type": "reply",
+        "parent_post_id": parent_id,
+        "channel_name": channel_name,
+    }
+
+
+def reply_lines_rows(df_rep, parent_id, category,
+                     channel_name, counters):
+    for _, rep in df_rep.iloc[1:].iterrows():
+        r_id = id_to_str(rep.get('id'))
+        content = safe_content(rep.get('message'))
+        if not content and not r_id:
+            counters['skipped'] += 1
+            continue
+
+        text_r = build_reply_text(
+            parent_id=parent_id,
+            reply_id=r_id,
+            channel=channel_name,
+            content=content,
+        )
+        meta_r = build_metadata(
+            row=rep,
+            schema=REPLY_META_SCHEMA,
+            extras=reply_extras(
+                category, parent_id, channel_name
+            ),
+        )
+        yield to_jsonl_line(text_r, meta_r)
+        counters['replies'] += 1
+
+
+def reply_lines_columnar(df_rep, parent_id, category,
+                         channel_name, counters):
+    values = df_rep.values[1:]
+    index = column_index(df_rep)
+
+    r_ids = [
+        id_to_str(v)
+        for v in column_values(values, index, 'id')
+    ]
+    contents = [
+        safe_content(v)
+        for v in column_values(values, index, 'message')
+    ]
+    metas = build_metadata_columns(
+        values, index, REPLY_META_SCHEMA,
+        extras=reply_extras(category, parent_id, channel_name),
+    )
+
+    lines = []
+    for r_id, content, meta_r in zip(r_ids, contents, metas):
+        if not content and not r_id:
+            counters['skipped'] += 1
+            continue
+        text_r = build_reply_text(
+            parent_id=parent_id,
+            reply_id=r_id,
+            channel=channel_name,
+            content=content,
+        )
+        lines.append(to_jsonl_line(text_r, meta_r))
+    counters['replies'] += len(lines)
+    return lines
+
+
 # ══════════════════════════════════════════════
 # PIPELINE
 # ══════════════════════════════════════════════
 
-def process_to_jsonl():
-    counters = {
+def process_channel(channel_dir, category, f_out, counters,
+                    vectorized=True, chunk_rows=None,
+                    chunk_min_bytes=CHUNK_MIN_BYTES):
+    """
+    Écrit posts + replies (+ recovered) d'un canal.
+    chunk_rows : lit le CSV des posts par blocs (RAM bornée) s'il
+    dépasse chunk_min_bytes.
+    """
+    channel_name = channel_dir.name
+    posts_csv = channel_dir / f"{channel_name}.csv"
+    replies_folder = channel_dir / f"{channel_name}_replies"
+    processed_ids = set()
+
+    post_lines = (
+        post_lines_columnar if vectorized else post_lines_rows
+    )
+    reply_lines = (
+        reply_lines_columnar if vectorized else reply_lines_rows
+    )
+
+    # ─── PHASE 1 : POSTS (Table 1) ───
+    if posts_csv.exists():
+        try:
+            chunked = (
+                chunk_rows
+                and posts_csv.stat().st_size > chunk_min_bytes
+            )
+            frames = (
+                iter_csv_chunks(posts_csv, chunk_rows)
+                if chunked else [read_channel_csv(posts_csv)]
+            )
+            for df in frames:
+                f_out.writelines(post_lines(
+                    df, category, channel_name,
+                    processed_ids, counters,
+                ))
+        except Exception as e:
+            print(
+                f"  ⚠️ Erreur Posts"
+                f" [{channel_name}]: {e}"
+            )
+
+    # ─── PHASE 2 : REPLIES & RECOVERY ───
+    if not replies_folder.exists():
+        return
+
+    for rf in sorted(replies_folder.iterdir()):
+        if not rf.name.endswith("_replies.csv"):
+            continue
+
+        parent_id = extract_post_id_from_filename(rf.name)
+        if not parent_id:
+            continue
+
+        try:
+            df_rep = read_channel_csv(rf)
+            if df_rep.empty:
+                continue
+
+            # AUTO-RECOVERY
+            if parent_id not in processed_ids:
+                f_out.write(recovered_post_line(
+                    df_rep.iloc[0], parent_id,
+                    category, channel_name,
+                ))
+                processed_ids.add(parent_id)
+                counters['recovered'] += 1
+                counters['posts'] += 1
+
+            # REPLIES
+            f_out.writelines(reply_lines(
+                df_rep, parent_id, category,
+                channel_name, counters,
+            ))
+
+        except Exception as e:
+            print(f"  ⚠️ Erreur {rf.name}: {e}")
+
+
+def new_counters():
+    return {
         'posts': 0, 'replies': 0,
         'recovered': 0, 'skipped': 0
     }
 
-    if not DATA_ROOT.exists():
-        print(f"❌ Dossier introuvable : {DATA_ROOT}")
-        return
 
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f_out:
+def add_counters(total, counters):
+    for key, value in counters.items():
+        total[key] += value
 
-        for category_dir in sorted(DATA_ROOT.iterdir()):
-            if not category_dir.is_dir():
-                continue
-            category = category_dir.name
-
-            for channel_dir in sorted(category_dir.iterdir()):
-                if not channel_dir.is_dir():
-                    continue
-
-                channel_name = channel_dir.name
-                posts_csv = channel_dir / f"{channel_name}.csv"
-                replies_folder = (
-                    channel_dir / f"{channel_name}_replies"
-                )
-                processed_ids = set()
-
-                # ─── PHASE 1 : POSTS (Table 1) ───
-                if posts_csv.exists():
-                    try:
-                        df = pd.read_csv(
-                            posts_csv, low_memory=False
-                        )
-                        df.rename(
-                            columns=lambda x: x.strip().lower(),
-                            inplace=True
-                        )
-
-                        for _, row in df.iterrows():
-                            p_id = id_to_str(
-                                row.get('post id')
-                                or row.get('id')
-                            )
-                            if not p_id:
-                                counters['skipped'] += 1
-                                continue
-
-                            content = safe_content(
-                                row.get('message')
-                            )
-                            text = build_post_text(
-                                post_id=p_id,
-                                channel=channel_name,
-                                content=content,
-                            )
-                            metadata = build_metadata(
-                                row=row,
-                                schema=POST_META_SCHEMA,
-                                extras={
-                                    "category": category,
-                                    "doc_type": "original_post",
-                                    "channel_name": channel_name,
-                                    "recovered": False,
-                                }
-                            )
-
-                            f_out.write(json.dumps(
-                                {"text": text,
-                                 "metadata": metadata},
-                                ensure_ascii=False
-                            ) + '\n')
-                            processed_ids.add(p_id)
-                            counters['posts'] += 1
-
-                    except Exception as e:
-                        print(
-                            f"  ⚠️ Erreur Posts"
-                            f" [{channel_name}]: {e}"
-                        )
-
-                # ─── PHASE 2 : REPLIES & RECOVERY ───
-                if replies_folder.exists():
-                    for rf in sorted(replies_folder.iterdir()):
-                        if not rf.name.endswith("_replies.csv"):
-                            continue
-
-                        parent_id = (
-                            extract_post_id_from_filename(rf.name)
-                        )
-                        if not parent_id:
-                            continue
-
-                        try:
-                            df_rep = pd.read_csv(
-                                rf, low_memory=False
-                            )
-                            df_rep.rename(
-                                columns=lambda x: x.strip().lower(),
-                                inplace=True
-                            )
-                            if df_rep.empty:
-                                continue
-
-                            # AUTO-RECOVERY
-                            if parent_id not in processed_ids:
-                                row0 = df_rep.iloc[0]
-                                content = safe_content(
-                                    row0.get('message')
-                                )
-                                text_rec = build_post_text(
-                                    post_id=parent_id,
-                                    channel=channel_name,
-                                    content=content,
-                                )
-                                meta_rec = build_metadata(
-                                    row=row0,
-                                    schema=REPLY_META_SCHEMA,
-                                    extras={
-                                        "category": category,
-                                        "doc_type":
-                                            "original_post",
-                                        "channel_name":
-                                            channel_name,
-                                        "recovered": True,
-                                    }
-                                )
-                                f_out.write(json.dumps(
-                                    {"text": text_rec,
-                                     "metadata": meta_rec},
-                                    ensure_ascii=False
-                                ) + '\n')
-                                processed_ids.add(parent_id)
-                                counters['recovered'] += 1
-                                counters['posts'] += 1
-
-                            # REPLIES
-                            for _, rep in (
-                                df_rep.iloc[1:].iterrows()
-                            ):
-                                r_id = id_to_str(
-                                    rep.get('id')
-                                )
-                                content = safe_content(
-                                    rep.get('message')
-                                )
-                                if not content and not r_id:
-                                    counters['skipped'] += 1
-                                    continue
-
-                                text_r = build_reply_text(
-                                    parent_id=parent_id,
-                                    reply_id=r_id,
-                                    channel=channel_name,
-                                    content=content,
-                                )
-                                meta_r = build_metadata(
-                                    row=rep,
-                                    schema=REPLY_META_SCHEMA,
-                                    extras={
-                                        "category": category,
-                                        "doc_type": "reply",
-                                        "parent_post_id":
-                                            parent_id,
-                                        "channel_name":
-                                            channel_name,
-                                    }
-                                )
-                                f_out.write(json.dumps(
-                                    {"text": text_r,
-                                     "metadata": meta_r},
-                                    ensure_ascii=False
-                                ) + '\n')
-                                counters['replies'] += 1
-
-                        except Exception as e:
-                            print(
-                                f"  ⚠️ Erreur"
-                                f" {rf.name}: {e}"
-                            )
-
-    # ─── RAPPORT ───
+
+def iter_channel_dirs(data_root):
+    """(catégorie, dossier canal) dans l'ordre de sortie."""
+    for category_dir in sorted(data_root.iterdir()):
+        if not category_dir.is_dir():
+            continue
+        for channel_dir in sorted(category_dir.iterdir()):
+            if channel_dir.is_dir():
+                yield category_dir.name, channel_dir
+
+
+def channel_key(category, channel_dir):
+    return f"{category}/{channel_dir.name}"
+
+
+# ══════════════════════════════════════════════
+# MANIFESTE (ingestion incrémentale)
+# ══════════════════════════════════════════════
+# Par canal : taille, mtime et SHA-256 de chaque CSV,
+# plus les compteurs (= nb de lignes JSONL du canal).
+# Les canaux inchangés sont recopiés depuis l'ancien
+# JSONL au lieu d'être re-parsés.
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def file_signature(path, previous=None):
+    """Le hash n'est recalculé que si taille/mtime ont bougé."""
+    stat = path.stat()
+    sig = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if (
+        previous
+        and previous['size'] == sig['size']
+        and previous['mtime_ns'] == sig['mtime_ns']
+    ):
+        sig['sha256'] = previous['sha256']
+    else:
+        sig['sha256'] = file_sha256(path)
+    return sig
+
+
+def channel_files(channel_dir):
+    channel_name = channel_dir.name
+    posts_csv = channel_dir / f"{channel_name}.csv"
+    replies_folder = channel_dir / f"{channel_name}_replies"
+
+    files = []
+    if posts_csv.exists():
+        files.append(posts_csv)
+    if replies_folder.exists():
+        files.extend(
+            rf for rf in sorted(replies_folder.iterdir())
+            if rf.name.endswith("_replies.csv")
+        )
+    return files
+
+
+def channel_signature(channel_dir, previous=None):
+    previous = previous or {}
+    return {
+        str(path.relative_to(channel_dir)): file_signature(
+            path, previous.get(str(path.relative_to(channel_dir)))
+        )
+        for path in channel_files(channel_dir)
+    }
+
+
+def same_files(sig_a, sig_b):
+    return (
+        sig_a.keys() == sig_b.keys()
+        and all(
+            sig_a[name]['sha256'] == sig_b[name]['sha256']
+            for name in sig_a
+        )
+    )
+
+
+def load_manifest(manifest_file, output_file):
+    """Canaux de l'ancien run, si le JSONL n'a pas bougé depuis."""
+    if not manifest_file.exists() or not output_file.exists():
+        return {}
+    with open(manifest_file, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('output_size') != output_file.stat().st_size:
+        print("  ⚠️ Manifeste périmé : reconstruction complète")
+        return {}
+    return manifest['channels']
+
+
+def save_manifest(manifest_file, output_file, channels):
+    tmp = manifest_file.with_name(manifest_file.name + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({
+            'output_size': output_file.stat().st_size,
+            'channels': channels,
+        }, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, manifest_file)
+
+
+def copy_lines(f_old, pos, start, count, f_out):
+    """
+    Recopie `count` lignes de l'ancien JSONL à partir de `start`.
+    Les canaux gardent leur ordre relatif d'un run à l'autre :
+    une seule passe avant sur l'ancien fichier suffit.
+    """
+    for _ in itertools.islice(f_old, start - pos):
+        pass
+    f_out.writelines(itertools.islice(f_old, count))
+    return start + count
+
+
+# ══════════════════════════════════════════════
+# ORCHESTRATION
+# ══════════════════════════════════════════════
+
+def process_channel_to_part(args):
+    """Worker : un canal → fichier partiel + ses compteurs."""
+    (channel_dir, category, part_file, vectorized,
+     chunk_rows, chunk_min_bytes) = args
+    counters = new_counters()
+    with open(part_file, 'w', encoding='utf-8') as f_part:
+        process_channel(
+            channel_dir, category, f_part, counters,
+            vectorized=vectorized, chunk_rows=chunk_rows,
+            chunk_min_bytes=chunk_min_bytes,
+        )
+    return counters
+
+
+def process_channels_parallel(channels, parts_dir, vectorized,
+                              workers, chunk_rows=None,
+                              chunk_min_bytes=CHUNK_MIN_BYTES):
+    """
+    Un canal par tâche dans un pool de processus.
+    Renvoie {clé canal: (fichier partiel, compteurs)} ;
+    l'appelant les concatène dans l'ordre des canaux.
+    """
+    tasks = [
+        (channel_dir, category,
+         parts_dir / f"{i:06d}.jsonl", vectorized, chunk_rows,
+         chunk_min_bytes)
+        for i, (category, channel_dir) in enumerate(channels)
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(process_channel_to_part, tasks)
+        return {
+            channel_key(category, channel_dir): (part_file, counters)
+            for (channel_dir, category, part_file, *_), counters
+            in zip(tasks, results)
+        }
+
+
+def print_report(output_file, workers, todo, reused, counters):
     total = counters['posts'] + counters['replies']
     print(f"\n{'═'*50}")
     print(f"  ✅ FUSION TERMINÉE")
     print(f"{'═'*50}")
-    print(f"  📄 Output          : {OUTPUT_FILE}")
+    print(f"  📄 Output          : {output_file}")
+    print(f"  🧵 Workers          : {workers}")
+    print(f"  ♻️  Canaux          : {len(todo)} traités, "
+          f"{len(reused)} inchangés")
     print(f"  📊 Posts            : {counters['posts']}")
     print(f"     ├─ Depuis CSV    : "
           f"{counters['posts'] - counters['recovered']}")
@@ -304,5 +717,129 @@ def process_to_jsonl():
     print(f"{'═'*50}\n")
 
 
+def process_to_jsonl(vectorized=True, data_root=DATA_ROOT,
+                     output_file=OUTPUT_FILE, workers=1,
+                     incremental=False, manifest_file=None,
+                     chunk_rows=None, chunk_min_bytes=CHUNK_MIN_BYTES):
+    """
+    cleaned_data/<catégorie>/<canal> → JSONL (.zst/.gz selon
+    le suffixe de output_file).
+    vectorized=False : ancienne boucle iterrows (référence).
+    workers > 1      : canaux traités en parallèle (processus).
+    incremental=True : seuls les canaux modifiés depuis le
+                       dernier run (manifeste) sont re-parsés.
+    chunk_rows       : CSV de posts de plus de chunk_min_bytes
+                       lus par blocs (RAM bornée).
+    """
+    counters = new_counters()
+    manifest_file = manifest_file or strip_compression(
+        output_file
+    ).with_suffix('.manifest.json')
+    compression = compression_of(output_file)
+
+    if not data_root.exists():
+        print(f"❌ Dossier introuvable : {data_root}")
+        return
+
+    channels = list(iter_channel_dirs(data_root))
+    previous = (
+        load_manifest(manifest_file, output_file)
+        if incremental else {}
+    )
+
+    # Lignes de chaque canal dans l'ancien JSONL
+    old_ranges = {}
+    line = 0
+    for key, entry in previous.items():
+        n_lines = entry['counters']['posts'] + entry['counters']['replies']
+        old_ranges[key] = (line, n_lines)
+        line += n_lines
+
+    entries = {}
+    for category, channel_dir in channels:
+        key = channel_key(category, channel_dir)
+        old_files = previous.get(key, {}).get('files')
+        entries[key] = {
+            'files': channel_signature(channel_dir, old_files)
+        }
+    reused = {
+        key for key, entry in entries.items()
+        if key in previous
+        and same_files(previous[key]['files'], entry['files'])
+    }
+    todo = [
+        (category, channel_dir) for category, channel_dir in channels
+        if channel_key(category, channel_dir) not in reused
+    ]
+
+    # Aucun canal ajouté, modifié ou supprimé : JSONL conservé tel
+    # quel, Parquet reconstruit seulement s'il manque ou est périmé
+    if previous and not todo and list(entries) == list(previous):
+        for key, entry in entries.items():
+            entry['counters'] = previous[key]['counters']
+            add_counters(counters, entry['counters'])
+        save_manifest(manifest_file, output_file, entries)
+        if not has_corpus(output_file):
+            write_corpus(output_file)
+        print_report(output_file, workers, todo, reused, counters)
+        return counters
+
+    tmp_output = output_file.with_name(output_file.name + '.tmp')
+    parts_dir = Path(tempfile.mkdtemp(
+        prefix='jsonl_parts_', dir=output_file.parent
+    ))
+    try:
+        parts = {}
+        if workers > 1 and len(todo) > 1:
+            parts = process_channels_parallel(
+                todo, parts_dir,
+                vectorized=vectorized, workers=workers,
+                chunk_rows=chunk_rows, chunk_min_bytes=chunk_min_bytes,
+            )
+
+        with contextlib.ExitStack() as stack:
+            f_out = stack.enter_context(
+                open_text(tmp_output, 'w', compression=compression)
+            )
+            f_old = None
+            if reused:
+                f_old = stack.enter_context(open_text(output_file))
+            pos = 0
+
+            for category, channel_dir in channels:
+                key = channel_key(category, channel_dir)
+                if key in reused:
+                    start, n_lines = old_ranges[key]
+                    pos = copy_lines(f_old, pos, start, n_lines, f_out)
+                    channel_counters = previous[key]['counters']
+                elif key in parts:
+                    part_file, channel_counters = parts[key]
+                    with open(part_file, 'r', encoding='utf-8') as f_part:
+                        shutil.copyfileobj(f_part, f_out)
+                else:
+                    channel_counters = new_counters()
+                    process_channel(
+                        channel_dir, category, f_out,
+                        channel_counters, vectorized=vectorized,
+                        chunk_rows=chunk_rows,
+                        chunk_min_bytes=chunk_min_bytes,
+                    )
+                entries[key]['counters'] = channel_counters
+                add_counters(counters, channel_counters)
+
+        os.replace(tmp_output, output_file)
+        save_manifest(manifest_file, output_file, entries)
+        write_corpus(output_file)
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+        if tmp_output.exists():
+            tmp_output.unlink()
+
+    print_report(output_file, workers, todo, reused, counters)
+    return counters
+
+
 if __name__ == "__main__":
-    process_to_jsonl()
\ No newline at end of file
+    process_to_jsonl(
+        workers=WORKERS, incremental=True, chunk_rows=CHUNK_ROWS,
+    )
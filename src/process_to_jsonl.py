@@ -1,11 +1,16 @@
 import pandas as pd
+import itertools
 import json
 import os
 import re
 
+from corpus import open_text
+from process_jsonl import iter_csv_chunks
+
 # --- CONFIGURATION ---
 DATA_ROOT = 'cleaned_data' 
-OUTPUT_FILE = 'darkgram_cti_final.jsonl'
+OUTPUT_FILE = 'darkgram_cti_final.jsonl'  # ou .jsonl.zst / .jsonl.gz
+CHUNK_ROWS = 50_000  # Posts lus par blocs : RAM bornée sur les gros CSV
 
 def clean_val(val):
     """Convertit les types NumPy/Pandas en types Python natifs pour le JSON."""
@@ -30,7 +35,7 @@ def process_to_jsonl():
     total_replies = 0
     total_recovered = 0
     
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f_out:
+    with open_text(OUTPUT_FILE, 'w') as f_out:
         if not os.path.exists(DATA_ROOT):
             print(f"Erreur : Le dossier {DATA_ROOT} n'existe pas.")
             return
@@ -49,10 +54,10 @@ def process_to_jsonl():
                 # --- PHASE 1 : POSTS ---
                 if os.path.exists(posts_csv):
                     try:
-                        df_posts = pd.read_csv(posts_csv, low_memory=False)
-                        df_posts.rename(columns=lambda x: x.strip().lower(), inplace=True)
+                        chunks = iter_csv_chunks(posts_csv, CHUNK_ROWS)
+                        posts = itertools.chain.from_iterable(df.iterrows() for df in chunks)
 
-                        for _, post in df_posts.iterrows():
+                        for _, post in posts:
                             p_id = id_to_str(post.get('post id'))
                             if not p_id: continue
                             # --- LOGIQUE D'ENRICHISSEMENT DU TEXTE (VECTOR INDEX) ---
@@ -3,11 +3,18 @@
 Agent CTI avec retrieval intelligent et Phi-3.5
 """
 
+import asyncio
+import itertools
 import re
 from langchain_ollama import OllamaLLM
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
+from answer_cache import AnswerCache
+from create_index import index_version as saved_index_version
+from doc_type_filter import search_doc_type
+from sqlite_docstore import SQLiteDocstore
+
 
 def get_llm():
     """Phi-3.5 via Ollama."""
@@ -57,68 +64,20 @@ def is_relevant_question(question):
 
 # Seuil de pertinence : au-dessus = non pertinent
 RELEVANCE_THRESHOLD = 1.0
-def retrieve_with_context(vectorstore, query,
-                          original_query=None, k=10):
-    """
-    Double recherche + récupération replies via docstore.
-    """
-    # Recherche 1 : query combinée
-    posts1 = vectorstore.similarity_search_with_score(
-        query=query,
-        k=k * 2,
-        filter={"doc_type": "original_post"},
-    )
-
-    # Recherche 2 : query originale
-    posts2 = []
-    if original_query and original_query != query:
-        posts2 = vectorstore.similarity_search_with_score(
-            query=original_query,
-            k=k * 2,
-            filter={"doc_type": "original_post"},
-        )
-
-    # Fusionner et dédupliquer
-    best_scores = {}
-    best_docs = {}
-
-    for doc, score in posts1 + posts2:
-        if score > RELEVANCE_THRESHOLD:
-            continue
-        post_id = doc.metadata.get("post_id", "")
-        if not post_id:
-            continue
-        if post_id not in best_scores or score < best_scores[post_id]:
-            best_scores[post_id] = score
-            best_docs[post_id] = doc
-
-    sorted_ids = sorted(best_scores, key=best_scores.get)
 
-    results = []
-    for post_id in sorted_ids[:k]:
-        doc = best_docs[post_id]
-        score = best_scores[post_id]
 
-        # Replies via docstore (PAS via similarity_search)
-        replies = get_replies_for_post(
-            vectorstore, post_id, max_replies=5
-        )
-
-        results.append({
-            "post": doc,
-            "score": score,
-            "post_id": post_id,
-            "replies": replies,
-        })
-
-    return results
 def get_replies_for_post(vectorstore, post_id, max_replies=5):
     """
     Récupère les replies directement depuis le docstore.
-    Pas de similarity search, juste un filtre exact.
+    Pas de similarity search : lecture de la table replies
+    (SQLiteDocstore), filtre exact sur tout le docstore sinon.
     """
+    docstore = vectorstore.docstore
+    if isinstance(docstore, SQLiteDocstore):
+        return docstore.replies(str(post_id), limit=max_replies)
+
     replies = []
-    for doc_id, doc in vectorstore.docstore._dict.items():
+    for doc_id, doc in docstore._dict.items():
         if doc.metadata.get("parent_post_id") == str(post_id):
             replies.append(doc)
             if len(replies) >= max_replies:
@@ -131,27 +90,31 @@ def retrieve_with_context(vectorstore, query,
     """
     Double recherche + récupération replies via docstore.
     """
-    # Recherche 1 : query combinée
-    posts1 = vectorstore.similarity_search_with_score(
-        query=query,
-        k=k * 2,
-        filter={"doc_type": "original_post"},
+    # Query combinée + query originale : un seul lot d'embedding,
+    # une seule recherche FAISS
+    queries = [query]
+    if original_query and original_query != query:
+        queries.append(original_query)
+    return expand_posts(vectorstore, search_posts(vectorstore, queries, k), k)
+
+
+def search_posts(vectorstore, queries, k=10):
+    """k * 2 original_post par requête (une liste par requête)."""
+    return search_doc_type(
+        vectorstore, queries, "original_post", k=k * 2
     )
 
-    # Recherche 2 : query originale
-    posts2 = []
-    if original_query and original_query != query:
-        posts2 = vectorstore.similarity_search_with_score(
-            query=original_query,
-            k=k * 2,
-            filter={"doc_type": "original_post"},
-        )
 
+def expand_posts(vectorstore, hits, k=10):
+    """
+    Fusion des résultats de search_posts (dans l'ordre des
+    requêtes), seuil de pertinence, puis replies des k meilleurs.
+    """
     # Fusionner et dédupliquer
     best_scores = {}
     best_docs = {}
 
-    for doc, score in posts1 + posts2:
+    for doc, score in itertools.chain.from_iterable(hits):
         if score > RELEVANCE_THRESHOLD:
             continue
         post_id = doc.metadata.get("post_id", "")
@@ -310,39 +273,46 @@ class CTIAgent:
         self.analysis_chain = (
             ANALYSIS_PROMPT | self.llm | self.parser
         )
+        self.answer_cache = AnswerCache()
 
     def analyze(self, question, k=10, verbose=True):
         """Pipeline RAG complet avec validation."""
-
+        for kind, payload in self.analyze_stream(question, k, verbose):
+            if kind == "result":
+                return payload
+
+    def analyze_stream(self, question, k=10, verbose=True):
+        """
+        analyze() en flux d'événements (type, contenu) :
+        - ("sources", [...])  dès la fin du retrieval
+        - ("token", str)      morceaux de l'analyse, au fil de la
+                              génération Ollama
+        - ("result", {...})   même dictionnaire qu'analyze()
+        """
         # Vérification pertinence question
         if not is_relevant_question(question):
-            msg = (
-                "⚠️ This question does not seem related "
-                "to Cyber Threat Intelligence.\n\n"
-                "Examples of valid questions:\n"
-                "- What cracking tools are shared?\n"
-                "- Which channels sell stolen credentials?\n"
-                "- What cloud logs are available?\n"
-                "- Are there pirated software shared?"
-            )
-            if verbose:
-                print(f"\n⚠️ Off-topic question detected")
-            return {
-                "question": question,
-                "rewritten": None,
-                "analysis": msg,
-                "sources": [],
-            }
+            yield from replay(off_topic_result(question, verbose))
+            return
 
-        # 1. Reformulation
         if verbose:
             print(f"\n🔍 Question : {question}")
-        raw_rewrite = self.rewrite_chain.invoke(
-            {"question": question}
+
+        # 0. Question proche déjà traitée sur le même index
+        # (vecteur gardé par le cache de requêtes pour le retrieval)
+        question_vector = self.vectorstore.embedding_function.embed_query(
+            question
+        )
+        index_version = self._index_version(verbose)
+        cached = self._cached_answer(question, question_vector,
+                                     index_version, verbose)
+        if cached is not None:
+            yield from replay(cached)
+            return
+
+        # 1. Reformulation
+        rewritten = clean_rewrite(
+            self.rewrite_chain.invoke({"question": question})
         )
-        rewritten = raw_rewrite.split("\n")[0].strip()
-        rewritten = re.sub(r'\(.*?\)', '', rewritten).strip()
-        rewritten = rewritten.strip('"').strip("'").strip()
 
         # Combiner : question originale DEUX FOIS + reformulation
         combined_query = f"{question} {question} {rewritten}"
@@ -352,7 +322,7 @@ class CTIAgent:
 
         # 2. Retrieval avec la requête combinée
         results = retrieve_with_context(
-            self.vectorstore, 
+            self.vectorstore,
             query=combined_query,
             original_query=question,
             k=k,
@@ -362,48 +332,203 @@ class CTIAgent:
 
         # Aucun résultat pertinent
         if not results:
-            if verbose:
-                print("❌ No results under threshold")
-            return {
+            result = no_result(question, rewritten, verbose)
+            self._store_answer(question_vector, index_version, result)
+            yield from replay(result)
+            return
+
+        # 3. Formatage + 4. Analyse, token par token
+        context = self._context(results, verbose)
+        yield "sources", analysis_result(question, rewritten, "", results)[
+            "sources"
+        ]
+        chunks = []
+        for chunk in self.analysis_chain.stream({
+            "context": context,
+            "question": question,
+        }):
+            chunks.append(chunk)
+            yield "token", chunk
+
+        result = analysis_result(
+            question, rewritten, "".join(chunks), results
+        )
+        self._store_answer(question_vector, index_version, result)
+        yield "result", result
+
+    async def aanalyze(self, question, k=10, verbose=True):
+        """
+        analyze() asynchrone, même résultat : la recherche sur la
+        question originale ne dépend pas de la reformulation et
+        tourne (thread) pendant la génération de celle-ci ; il ne
+        reste ensuite que la recherche combinée et la fusion.
+        """
+        if not is_relevant_question(question):
+            return off_topic_result(question, verbose)
+
+        if verbose:
+            print(f"\n🔍 Question : {question}")
+
+        question_vector = await asyncio.to_thread(
+            self.vectorstore.embedding_function.embed_query, question
+        )
+        index_version = self._index_version(verbose)
+        cached = self._cached_answer(question, question_vector,
+                                     index_version, verbose)
+        if cached is not None:
+            return cached
+
+        # 1. Reformulation ∥ recherche spéculative (question originale)
+        original_search = asyncio.create_task(asyncio.to_thread(
+            search_posts, self.vectorstore, [question], k
+        ))
+        try:
+            rewritten = clean_rewrite(
+                await self.rewrite_chain.ainvoke({"question": question})
+            )
+        except BaseException:
+            original_search.cancel()
+            raise
+
+        combined_query = f"{question} {question} {rewritten}"
+
+        if verbose:
+            print(f"🔄 Reformulée : {rewritten}")
+
+        # 2. Recherche combinée, puis fusion (même ordre que
+        # retrieve_with_context : combinée, puis originale)
+        hits = await asyncio.to_thread(
+            search_posts, self.vectorstore, [combined_query], k
+        )
+        original_hits = await original_search
+        if combined_query != question:
+            hits += original_hits
+        results = await asyncio.to_thread(
+            expand_posts, self.vectorstore, hits, k
+        )
+        if verbose:
+            print(f"📦 {len(results)} résultats pertinents")
+
+        if not results:
+            result = no_result(question, rewritten, verbose)
+        else:
+            context = self._context(results, verbose)
+            analysis = await self.analysis_chain.ainvoke({
+                "context": context,
                 "question": question,
-                "rewritten": rewritten,
-                "analysis": (
-                    "❌ No relevant results found "
-                    "in the DarkGram database.\n"
-                    "Retrieved documents had similarity scores "
-                    "too low "
-                    f"(threshold: {RELEVANCE_THRESHOLD})."
-                ),
-                "sources": [],
-            }
+            })
+            result = analysis_result(question, rewritten, analysis, results)
+
+        self._store_answer(question_vector, index_version, result)
+        return result
+
+    def _index_version(self, verbose):
+        """
+        Version de l'index relue sur disque à chaque question (build
+        id de la version servie) : une reconstruction par un autre
+        processus invalide le cache de réponses. Vectorstore pas
+        chargé depuis le disque : sa version en mémoire.
+        """
+        loaded = getattr(self.vectorstore, "index_version", None)
+        index_path = getattr(self.vectorstore, "index_path", None)
+        if index_path is None:
+            return loaded
+        version = saved_index_version(index_path)
+        if verbose and version != loaded:
+            print("⚠️ Index reconstruit depuis le chargement : "
+                  "réponses non mises en cache, relancer l'agent")
+        return version
+
+    def _store_answer(self, question_vector, index_version, result):
+        # Index reconstruit depuis le chargement : résultat tiré de
+        # l'ancienne version, pas gardé sous la nouvelle
+        if index_version == getattr(self.vectorstore, "index_version", None):
+            self.answer_cache.put(question_vector, index_version, result)
+
+    def _cached_answer(self, question, question_vector, index_version,
+                       verbose):
+        cached = self.answer_cache.get(question_vector, index_version)
+        if cached is None:
+            return None
+        if verbose:
+            print(f"♻️ Réponse en cache "
+                  f"(question proche : {cached['question']})")
+        return {**cached, "question": question}
 
-        # 3. Formatage
+    @staticmethod
+    def _context(results, verbose):
         context = format_context(results, max_results=3)
         if verbose:
             print(f"📋 Contexte : {len(context)} car.")
-
-        # 4. Analyse
-        if verbose:
             print(f"🤖 Analyse en cours...")
+        return context
 
-        analysis = self.analysis_chain.invoke({
-            "context": context,
-            "question": question,
-        })
 
-        return {
-            "question": question,
-            "rewritten": rewritten,
-            "analysis": analysis,
-            "sources": [
-                {
-                    "post_id": r["post_id"],
-                    "score": r["score"],
-                    "replies": len(r["replies"]),
-                    "channel": r["post"].metadata.get(
-                        "channel_name", ""
-                    ),
-                }
-                for r in results[:5]
-            ],
-        }
\ No newline at end of file
+def clean_rewrite(raw_rewrite):
+    """Première ligne de la reformulation, sans parenthèses ni guillemets."""
+    rewritten = raw_rewrite.split("\n")[0].strip()
+    rewritten = re.sub(r'\(.*?\)', '', rewritten).strip()
+    return rewritten.strip('"').strip("'").strip()
+
+
+def replay(result):
+    """Événements d'analyze_stream pour un résultat déjà complet."""
+    yield "sources", result["sources"]
+    yield "token", result["analysis"]
+    yield "result", result
+
+
+def off_topic_result(question, verbose):
+    msg = (
+        "⚠️ This question does not seem related "
+        "to Cyber Threat Intelligence.\n\n"
+        "Examples of valid questions:\n"
+        "- What cracking tools are shared?\n"
+        "- Which channels sell stolen credentials?\n"
+        "- What cloud logs are available?\n"
+        "- Are there pirated software shared?"
+    )
+    if verbose:
+        print(f"\n⚠️ Off-topic question detected")
+    return {
+        "question": question,
+        "rewritten": None,
+        "analysis": msg,
+        "sources": [],
+    }
+
+
+def no_result(question, rewritten, verbose):
+    if verbose:
+        print("❌ No results under threshold")
+    return {
+        "question": question,
+        "rewritten": rewritten,
+        "analysis": (
+            "❌ No relevant results found "
+            "in the DarkGram database.\n"
+            "Retrieved documents had similarity scores "
+            "too low "
+            f"(threshold: {RELEVANCE_THRESHOLD})."
+        ),
+        "sources": [],
+    }
+
+
+def analysis_result(question, rewritten, analysis, results):
+    return {
+        "question": question,
+        "rewritten": rewritten,
+        "analysis": analysis,
+        "sources": [
+            {
+                "post_id": r["post_id"],
+                "score": r["score"],
+                "replies": len(r["replies"]),
+                "channel": r["post"].metadata.get(
+                    "channel_name", ""
+                ),
+            }
+            for r in results[:5]
+        ],
+    }
@@ -0,0 +1,225 @@
+# sqlite_docstore.py
+"""
+Docstore SQLite de l'index FAISS, à la place de l'InMemoryDocstore
+picklé : documents lus à la demande par id, LRU borné en mémoire,
+métadonnées en JSON (aucun pickle au chargement).
+
+La base est ouverte en lecture seule. Les ajouts / suppressions /
+mises à jour de métadonnées (update_index) restent en attente en
+mémoire jusqu'à write_docstore(), qui écrit une nouvelle base
+basculée avec l'index.
+
+Table replies : parent_post_id → ids des replies, classées à
+l'écriture (vues, forwards, puis date) ; l'expansion des replies
+d'un post est une lecture de clé, indépendante de la taille du corpus.
+"""
+
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+
+CACHE_SIZE = 4096   # documents gardés en mémoire (LRU)
+
+SCHEMA = """
+CREATE TABLE docs (
+    id           TEXT PRIMARY KEY,
+    page_content TEXT NOT NULL,
+    metadata     TEXT NOT NULL
+)
+"""
+INSERT = "INSERT INTO docs (id, page_content, metadata) VALUES (?, ?, ?)"
+UPDATE = "UPDATE docs SET page_content = ?, metadata = ? WHERE id = ?"
+
+REPLIES_SCHEMA = """
+CREATE TABLE replies (
+    parent_post_id TEXT NOT NULL,
+    rank           INTEGER NOT NULL,
+    doc_id         TEXT NOT NULL,
+    PRIMARY KEY (parent_post_id, rank)
+) WITHOUT ROWID
+"""
+
+# Vues / forwards non numériques ("" si absents) → 0
+ENGAGEMENT = """
+CASE WHEN json_type(metadata, '$.{0}') IN ('integer', 'real')
+     THEN json_extract(metadata, '$.{0}') ELSE 0 END
+"""
+
+# Plus vues d'abord, puis plus partagées, puis les plus anciennes
+INSERT_REPLIES = f"""
+INSERT INTO replies
+SELECT parent_post_id,
+       ROW_NUMBER() OVER (
+           PARTITION BY parent_post_id
+           ORDER BY views DESC, forwards DESC, date, doc_rowid
+       ),
+       id
+FROM (
+    SELECT rowid AS doc_rowid, id,
+           json_extract(metadata, '$.parent_post_id') AS parent_post_id,
+           {ENGAGEMENT.format('views')} AS views,
+           {ENGAGEMENT.format('forwards')} AS forwards,
+           json_extract(metadata, '$.date') AS date
+    FROM docs
+)
+WHERE parent_post_id IS NOT NULL AND parent_post_id != ''
+"""
+
+
+def to_row(doc_id, doc):
+    return (
+        doc_id, doc.page_content,
+        json.dumps(doc.metadata, ensure_ascii=False),
+    )
+
+
+def to_document(page_content, metadata):
+    return Document(page_content=page_content, metadata=json.loads(metadata))
+
+
+class SQLiteDocstore(Docstore, AddableMixin):
+    """Docstore LangChain adossé à une base SQLite en lecture seule."""
+
+    def __init__(self, path, cache_size=CACHE_SIZE):
+        self.path = Path(path)
+        self.cache_size = cache_size
+        self._conn = sqlite3.connect(
+            f"{self.path.resolve().as_uri()}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+        )
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._added = {}      # en attente de write_docstore
+        self._deleted = set()
+        self._updated = {}    # documents déjà stockés, remplacés
+
+    def _stored(self, doc_id):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM docs WHERE id = ?", (doc_id,)
+            ).fetchone() is not None
+
+    def search(self, search):
+        if search in self._added:
+            return self._added[search]
+        if search in self._updated:
+            return self._updated[search]
+        if search in self._deleted:
+            return f"ID {search} not found."
+
+        with self._lock:
+            doc = self._cache.get(search)
+            if doc is not None:
+                self._cache.move_to_end(search)
+                return doc
+            row = self._conn.execute(
+                "SELECT page_content, metadata FROM docs WHERE id = ?",
+                (search,),
+            ).fetchone()
+            if row is None:
+                return f"ID {search} not found."
+            doc = to_document(*row)
+            self._cache[search] = doc
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return doc
+
+    def add(self, texts):
+        overlapping = [
+            doc_id for doc_id in texts
+            if doc_id in self._added
+            or (doc_id not in self._deleted and self._stored(doc_id))
+        ]
+        if overlapping:
+            raise ValueError(
+                f"Tried to add ids that already exist: {overlapping}"
+            )
+        self._added.update(texts)
+
+    def update(self, texts):
+        """Remplace des documents existants (métadonnées modifiées)."""
+        for doc_id, doc in texts.items():
+            if doc_id in self._added:
+                self._added[doc_id] = doc
+                continue
+            if doc_id in self._deleted or not self._stored(doc_id):
+                raise ValueError(f"ID {doc_id} not found.")
+            self._updated[doc_id] = doc
+            with self._lock:
+                self._cache.pop(doc_id, None)
+
+    def delete(self, ids):
+        for doc_id in ids:
+            self._updated.pop(doc_id, None)
+            if self._added.pop(doc_id, None) is not None:
+                continue
+            if doc_id in self._deleted or not self._stored(doc_id):
+                raise ValueError(f"ID {doc_id} not found.")
+            self._deleted.add(doc_id)
+            with self._lock:
+                self._cache.pop(doc_id, None)
+
+    def replies(self, post_id, limit):
+        """Replies du post `post_id`, dans l'ordre de la table replies."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT d.id, d.page_content, d.metadata "
+                "FROM replies r JOIN docs d ON d.id = r.doc_id "
+                "WHERE r.parent_post_id = ? ORDER BY r.rank LIMIT ?",
+                (post_id, limit + len(self._deleted)),
+            ).fetchall()
+
+        docs = [
+            self._updated.get(doc_id)
+            or to_document(page_content, metadata)
+            for doc_id, page_content, metadata in rows
+            if doc_id not in self._deleted
+        ]
+        # Ajouts en attente : classés à la prochaine sauvegarde
+        docs.extend(
+            doc for doc in self._added.values()
+            if doc.metadata.get('parent_post_id') == post_id
+        )
+        return docs[:limit]
+
+
+def write_docstore(docstore, ids, path):
+    """
+    Nouvelle base SQLite `path` pour les documents `ids` (ordre de
+    l'index) : copie de la base + changements en attente pour un
+    SQLiteDocstore, écriture complète sinon (InMemoryDocstore).
+    La table replies est reconstruite à chaque écriture.
+    """
+    conn = sqlite3.connect(path)
+    try:
+        if isinstance(docstore, SQLiteDocstore):
+            with docstore._lock:
+                docstore._conn.backup(conn)
+            conn.executemany(
+                "DELETE FROM docs WHERE id = ?",
+                ((doc_id,) for doc_id in docstore._deleted),
+            )
+            conn.executemany(INSERT, (
+                to_row(doc_id, doc) for doc_id, doc in docstore._added.items()
+            ))
+            conn.executemany(UPDATE, (
+                to_row(doc_id, doc)[1:] + (doc_id,)
+                for doc_id, doc in docstore._updated.items()
+            ))
+        else:
+            conn.execute(SCHEMA)
+            conn.executemany(INSERT, (
+                to_row(doc_id, docstore.search(doc_id)) for doc_id in ids
+            ))
+        conn.execute("DROP TABLE IF EXISTS replies")
+        conn.execute(REPLIES_SCHEMA)
+        conn.execute(INSERT_REPLIES)
+        conn.commit()
+    finally:
+        conn.close()
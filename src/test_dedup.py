@@ -0,0 +1,152 @@
+# test_dedup.py
+"""
+Déduplication sur un petit JSONL synthétique : le même post publié
+dans trois canaux est fusionné dans le plus vu, et les replies des
+posts supprimés sont rattachées au post canonique (parent_post_id,
+canal, texte). Vérifie aussi que cluster_signatures reste linéaire
+quand des milliers de posts identiques partagent les mêmes buckets,
+et qu'un quasi-doublon est trouvé même quand le 1er post de chacun
+des buckets partagés est différent.
+"""
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+import numpy as np
+
+from corpus import extract_content, extract_ids, iter_jsonl
+from dedup import (
+    BANDS, NUM_PERM, cluster_signatures, dedup_jsonl, minhash,
+)
+from process_jsonl import build_post_text, build_reply_text
+
+N_IDENTICAL = 4000
+CONTENT = "fresh combo list mail pass cloud logs dump " * 5
+
+
+def post(channel, post_id, views, content=CONTENT):
+    return {
+        'text': build_post_text(post_id, channel, content),
+        'metadata': {
+            'doc_type': 'original_post', 'channel_name': channel,
+            'views': views,
+        },
+    }
+
+
+def reply(channel, parent_id, reply_id, content):
+    return {
+        'text': build_reply_text(parent_id, reply_id, channel, content),
+        'metadata': {
+            'doc_type': 'reply', 'channel_name': channel,
+            'parent_post_id': str(parent_id),
+        },
+    }
+
+
+docs = [
+    post("chanA", 1, 100),
+    post("chanB", 7, 5000),     # canonique (le plus vu)
+    post("chanC", 3, 10),
+    post("chanC", 4, 10, content="vpn crack tool free " * 5),
+    reply("chanA", 1, 11, "merci pour A"),
+    reply("chanB", 7, 12, "merci pour B"),
+    reply("chanC", 3, 13, "merci pour C"),
+    reply("chanC", 4, 14, "autre post"),
+    reply("chanB", 1, 15, "même id, autre canal"),
+]
+
+tmp = Path(tempfile.mkdtemp(prefix="test_dedup_"))
+try:
+    src = tmp / "docs.jsonl"
+    src.write_text(
+        "".join(json.dumps(doc, ensure_ascii=False) + "\n" for doc in docs),
+        encoding='utf-8',
+    )
+    out = tmp / "dedup.jsonl"
+    dedup_jsonl(src, out)
+    result = list(iter_jsonl(out))
+finally:
+    shutil.rmtree(tmp)
+
+posts = {
+    (d['metadata']['channel_name'], extract_ids(d['text'])[0]): d
+    for d in result if d['metadata']['doc_type'] == 'original_post'
+}
+replies = {
+    extract_ids(d['text'])[1]: d
+    for d in result if d['metadata']['doc_type'] == 'reply'
+}
+
+print("═" * 60)
+print("  DÉDUPLICATION : posts fusionnés et replies rattachées")
+print("═" * 60)
+
+failed = 0
+
+
+def check(label, ok):
+    global failed
+    failed += not ok
+    print(f"  {'✅' if ok else '❌'} {label}")
+
+
+check("posts gardés : chanB/7 et chanC/4",
+      set(posts) == {("chanB", "7"), ("chanC", "4")})
+check("duplicate_count = 2",
+      posts["chanB", "7"]['metadata'].get('duplicate_count') == 2)
+check("toutes les replies conservées", set(replies) == {
+    "11", "12", "13", "14", "15"})
+
+for reply_id in ("11", "12", "13"):
+    doc = replies[reply_id]
+    check(
+        f"reply {reply_id} → chanB/7",
+        doc['metadata']['parent_post_id'] == "7"
+        and doc['metadata']['channel_name'] == "chanB"
+        and extract_ids(doc['text'])[0] == "7"
+        and "CHANNEL: chanB |" in doc['text']
+        and extract_content(doc['text']).startswith("merci pour"),
+    )
+for reply_id, channel, parent in (("14", "chanC", "4"),
+                                  ("15", "chanB", "1")):
+    doc = replies[reply_id]
+    check(
+        f"reply {reply_id} inchangée ({channel}/{parent})",
+        doc == next(
+            d for d in docs if extract_ids(d['text'])[1] == reply_id
+        ),
+    )
+
+signatures = [minhash(CONTENT)] * N_IDENTICAL
+t0 = time.perf_counter()
+roots = cluster_signatures(signatures)
+elapsed = time.perf_counter() - t0
+check(f"{N_IDENTICAL} posts identiques → 1 groupe ({elapsed:.2f} s)",
+      len({roots[i] for i in range(N_IDENTICAL)}) == 1)
+
+# B et C identiques sauf la dernière bande ; chaque bande partagée
+# a d'abord reçu un post A_k qui n'a que cette bande en commun avec
+# B (Jaccard estimé 1/BANDS)
+rows = NUM_PERM // BANDS
+rng = np.random.default_rng(0)
+sig_b = rng.integers(0, 2**32, NUM_PERM, dtype=np.uint32)
+sig_c = sig_b.copy()
+sig_c[-rows:] = rng.integers(0, 2**32, rows, dtype=np.uint32)
+decoys = []
+for band in range(BANDS - 1):
+    shared = slice(band * rows, (band + 1) * rows)
+    sig_a = rng.integers(0, 2**32, NUM_PERM, dtype=np.uint32)
+    sig_a[shared] = sig_b[shared]
+    decoys.append(sig_a)
+roots = cluster_signatures(decoys + [sig_b, sig_c])
+check("quasi-doublon derrière un 1er post différent → fusionné",
+      roots[-1] == roots[-2]
+      and len(set(roots[:-2]) | {roots[-1]}) == BANDS)
+
+print(f"\n  {'✅ OK' if not failed else f'❌ {failed} échec(s)'}")
+sys.exit(1 if failed else 0)
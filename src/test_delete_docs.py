@@ -0,0 +1,99 @@
+# test_delete_docs.py
+"""
+delete_docs sur chaque type d'index, vecteurs synthétiques : après
+suppression d'un tiers des documents, chaque position FAISS doit
+pointer (index_to_docstore_id) vers le bon document. Recherche de
+chaque document gardé par son propre vecteur : le 1er résultat doit
+être lui-même (index approchés : dans les K premiers), et aucun
+document supprimé ne doit revenir. Les vecteurs gardés doivent
+venir du cache d'embeddings : l'index reconstruit est celui qu'on
+construit directement sur les vecteurs exacts (IVF-PQ compris,
+sans re-quantification de vecteurs reconstruits).
+"""
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from ann_index import (
+    INDEX_TYPES, build_ann_index, index_type_of, index_vectors,
+)
+from create_index import delete_docs
+from embedding_cache import CachedEmbeddings, EmbeddingCache, content_hash
+
+# 2/3 gardés ≥ 256 × 39 : réentraînement PQ 8 bits (et 256 listes
+# IVF) sans avertissement faiss après suppression
+N_DOCS = 15_000
+DIM = 64
+K = 10
+MIN_RECALL = 0.95   # index approchés ; ~0 si positions décalées
+
+rng = np.random.default_rng(0)
+vectors = rng.standard_normal((N_DOCS, DIM)).astype(np.float32)
+ids = [f"doc{i}" for i in range(N_DOCS)]
+removed = set(ids[::3])
+kept = [i for i, id_ in enumerate(ids) if id_ not in removed]
+
+# Cache d'embeddings (par contenu) rempli des vecteurs exacts
+cache = EmbeddingCache(tempfile.mkdtemp(prefix="test_delete_"), "synthetic")
+cache.add([content_hash(id_) for id_ in ids], vectors)
+embeddings = CachedEmbeddings(None, cache)
+
+print("═" * 60)
+print(f"  delete_docs : {len(removed)} documents supprimés sur {N_DOCS}")
+print("═" * 60)
+
+failed = 0
+for index_type in INDEX_TYPES:
+    vectorstore = FAISS(
+        embedding_function=embeddings,
+        index=build_ann_index(vectors, index_type),
+        docstore=InMemoryDocstore({
+            id_: Document(page_content=id_) for id_ in ids
+        }),
+        index_to_docstore_id=dict(enumerate(ids)),
+    )
+    delete_docs(vectorstore, list(removed))
+    exact = np.array_equal(
+        index_vectors(vectorstore.index),
+        index_vectors(build_ann_index(vectors[kept], index_type)),
+    )
+
+    _, positions = vectorstore.index.search(vectors[kept], K)
+    hits = [
+        [
+            vectorstore.index_to_docstore_id.get(pos)
+            for pos in row if pos != -1
+        ]
+        for row in positions
+    ]
+    top1 = np.mean([row[:1] == [ids[i]] for i, row in zip(kept, hits)])
+    top_k = np.mean([ids[i] in row for i, row in zip(kept, hits)])
+    leaked = sum(id_ in removed for row in hits for id_ in row)
+    mapped = all(
+        vectorstore.docstore.search(id_).page_content == id_
+        for id_ in vectorstore.index_to_docstore_id.values()
+    )
+
+    ok = (
+        index_type_of(vectorstore.index) == index_type
+        and vectorstore.index.ntotal == len(kept)
+        and len(vectorstore.index_to_docstore_id) == len(kept)
+        and mapped and not leaked and exact
+        and (top1 == 1.0 if index_type == 'flat' else top_k >= MIN_RECALL)
+    )
+    failed += not ok
+    print(f"  {'✅' if ok else '❌'} {index_type:8s} : "
+          f"{vectorstore.index.ntotal} vecteurs | top-1 {top1:.1%} | "
+          f"top-{K} {top_k:.1%} | supprimés revenus : {leaked} | "
+          f"vecteurs exacts : {'oui' if exact else 'non'}")
+
+shutil.rmtree(cache.dir.parent)
+print(f"\n  {'✅ OK' if not failed else f'❌ {failed} échec(s)'}")
+sys.exit(1 if failed else 0)
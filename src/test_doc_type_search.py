@@ -0,0 +1,59 @@
+# test_doc_type_search.py
+"""
+Recherche original_post par sélecteur FAISS (search_doc_type) vs
+filtre LangChain exhaustif (fetch_k = tout l'index) : mêmes posts,
+même ordre, mêmes scores. Affiche aussi combien de posts le filtre
+par défaut (fetch_k=20) rend réellement.
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+import numpy as np
+
+from ann_index import index_type_of
+from create_index import load_index
+from doc_type_filter import search_doc_type
+from eval_questions import RETRIEVAL_QUESTIONS, SCORE_QUESTIONS
+
+K = 20   # k * 2 dans retrieve_with_context
+
+vectorstore = load_index()
+exact = index_type_of(vectorstore.index) == 'flat'
+
+print("═" * 60)
+print("  RECHERCHE original_post : SÉLECTEUR vs FILTRE")
+print("═" * 60)
+if not exact:
+    print("  ⚠️ Index approché : écarts possibles sur les derniers rangs")
+
+questions = SCORE_QUESTIONS + RETRIEVAL_QUESTIONS
+# Toutes les questions en une recherche multi-requêtes
+batched = search_doc_type(vectorstore, questions, "original_post", k=K)
+
+failed = 0
+for q, selected in zip(questions, batched):
+    filtered = vectorstore.similarity_search_with_score(
+        query=q, k=K, filter={"doc_type": "original_post"},
+        fetch_k=vectorstore.index.ntotal,
+    )
+    default = vectorstore.similarity_search_with_score(
+        query=q, k=K, filter={"doc_type": "original_post"},
+    )
+
+    same = (
+        [doc.metadata.get("post_id") for doc, _ in selected]
+        == [doc.metadata.get("post_id") for doc, _ in filtered]
+        and np.allclose(
+            [score for _, score in selected],
+            [score for _, score in filtered],
+        )
+    )
+    failed += not same
+    print(
+        f"  {'✅ PASS' if same else '❌ FAIL'} | "
+        f"{len(selected):2d} posts (filtre fetch_k=20 : "
+        f"{len(default):2d}) | {q[:40]}"
+    )
+
+sys.exit(1 if failed and exact else 0)
@@ -0,0 +1,60 @@
+# test_onnx_parity.py
+"""
+Parité du backend ONNX avec PyTorch : similarité cosinus entre
+les vecteurs des deux backends, pour les mêmes textes (questions
+de test + chunks du corpus).
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+import itertools
+
+import numpy as np
+
+from create_index import get_embedding_model
+from eval_questions import RETRIEVAL_QUESTIONS
+from load_documents import iter_prepared_batches
+
+N_CHUNKS = 500
+
+# Cosinus minimal attendu avec les vecteurs PyTorch
+MIN_COSINE = {
+    'onnx': 0.9999,
+    'onnx-int8': 0.98,
+}
+
+chunks = [
+    doc.page_content
+    for batch in itertools.islice(iter_prepared_batches(), 1)
+    for doc in batch[:N_CHUNKS]
+]
+texts = RETRIEVAL_QUESTIONS + chunks
+
+reference = np.asarray(
+    get_embedding_model('torch').embed_documents(texts), dtype=np.float32
+)
+
+print("═" * 60)
+print("  PARITÉ ONNX vs PYTORCH")
+print("═" * 60)
+print(f"  Textes : {len(RETRIEVAL_QUESTIONS)} questions + "
+      f"{len(chunks)} chunks")
+
+failed = 0
+for backend, min_cosine in MIN_COSINE.items():
+    vectors = np.asarray(
+        get_embedding_model(backend).embed_documents(texts),
+        dtype=np.float32,
+    )
+    # Vecteurs normalisés des deux côtés : cosinus = produit scalaire
+    cosines = (vectors * reference).sum(axis=1)
+    ok = cosines.min() >= min_cosine
+    failed += not ok
+    print(
+        f"  {'✅ PASS' if ok else '❌ FAIL'} | {backend:9s} | "
+        f"cos min {cosines.min():.5f} | "
+        f"moyen {cosines.mean():.5f} | seuil {min_cosine}"
+    )
+
+sys.exit(1 if failed else 0)
@@ -0,0 +1,63 @@
+# test_pool_parity.py
+"""
+Parité de l'embedding multi-processus (ParallelEmbeddings) avec le
+chemin local (BucketedEmbeddings) : mêmes lots, mais threads intra-op
+différents dans les workers, donc réductions flottantes dans un autre
+ordre. Cosinus et écart absolu maximal entre les deux, sur les
+questions de test + chunks du corpus.
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+import itertools
+
+import numpy as np
+
+from create_index import EMBEDDING_BACKEND, get_embedding_model
+from embedding_pool import BucketedEmbeddings, ParallelEmbeddings
+from eval_questions import RETRIEVAL_QUESTIONS
+from load_documents import iter_prepared_batches
+
+N_CHUNKS = 500
+WORKERS = 2
+MIN_COSINE = 0.9999
+
+if __name__ == "__main__":
+    chunks = [
+        doc.page_content
+        for batch in itertools.islice(iter_prepared_batches(), 1)
+        for doc in batch[:N_CHUNKS]
+    ]
+    texts = RETRIEVAL_QUESTIONS + chunks
+
+    reference = np.asarray(
+        BucketedEmbeddings(get_embedding_model()).embed_documents(texts),
+        dtype=np.float32,
+    )
+    pool = ParallelEmbeddings(
+        get_embedding_model(), WORKERS, EMBEDDING_BACKEND
+    )
+    try:
+        vectors = np.asarray(pool.embed_documents(texts), dtype=np.float32)
+    finally:
+        pool.close()
+
+    # Vecteurs normalisés des deux côtés : cosinus = produit scalaire
+    cosines = (vectors * reference).sum(axis=1)
+    max_diff = np.abs(vectors - reference).max()
+    ok = cosines.min() >= MIN_COSINE
+
+    print("═" * 60)
+    print(f"  PARITÉ POOL ({WORKERS} workers) vs LOCAL")
+    print("═" * 60)
+    print(f"  Textes : {len(RETRIEVAL_QUESTIONS)} questions + "
+          f"{len(chunks)} chunks")
+    print(
+        f"  {'✅ PASS' if ok else '❌ FAIL'} | "
+        f"cos min {cosines.min():.6f} | écart max {max_diff:.2e} | "
+        f"identiques {np.array_equal(vectors, reference)} | "
+        f"seuil {MIN_COSINE}"
+    )
+
+    sys.exit(0 if ok else 1)
@@ -10,6 +10,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
 
 from create_index import load_index
 from rag_chain import CTIAgent
+from eval_questions import ON_TOPIC as on_topic
 
 vectorstore = load_index()
 agent = CTIAgent(vectorstore)
@@ -50,49 +51,6 @@ print(f"\n  Résultat : {pass_count}/{len(off_topic)} rejetées")
 # TEST 2 : Questions CTI (doit RÉPONDRE)
 # ══════════════════════════════════════════════
 
-on_topic = [
-    {
-        "question": "What cracking tools are shared?",
-        "expected_post": "573",
-        "expected_channel": "hackingandcrackingtools",
-    },
-    {
-        "question": "What are dark method cloud logs?",
-        "expected_post": "381",
-        "expected_channel": "hackingandcrackingtools",
-    },
-    {
-        "question": "What cloud logs are available?",
-        "expected_post": None,
-        "expected_channel": None,
-    },
-    {
-        "question": "What stolen credentials are sold?",
-        "expected_post": None,
-        "expected_channel": None,
-    },
-    {
-        "question": "What pirated software is shared?",
-        "expected_post": None,
-        "expected_channel": None,
-    },
-    {
-        "question": "combo list mail pass",
-        "expected_post": None,
-        "expected_channel": None,
-    },
-    {
-        "question": "carding credit card stolen",
-        "expected_post": None,
-        "expected_channel": None,
-    },
-    {
-        "question": "android malware telegram",
-        "expected_post": None,
-        "expected_channel": None,
-    },
-]
-
 print(f"\n{'═' * 60}")
 print("  TEST 2 : Questions CTI (doit répondre)")
 print("═" * 60)
@@ -8,21 +8,10 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
 
 from create_index import load_index
+from eval_questions import SCORE_QUESTIONS as questions
 
 vectorstore = load_index()
 
-# Questions de test CTI
-questions = [
-    "cracking tools",
-    "stolen credentials",
-    "cloud logs",
-    "pirated software",
-    "hacking tutorial",
-    "combo list mail pass",
-    "carding credit card",
-    "malware android",
-]
-
 print("═" * 60)
 print("  DIAGNOSTIC DES SCORES FAISS")
 print("═" * 60)
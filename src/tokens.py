@@ -0,0 +1,52 @@
+# tokens.py
+"""
+Comptage de tokens all-mpnet-base-v2, par lots, via le
+tokenizer rapide (Rust) : longueurs uniquement, sans tenseurs.
+Le tokenizer est chargé une seule fois et partagé.
+"""
+
+from functools import lru_cache
+
+MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
+MODEL_MAX_TOKENS = 384   # limite d'entrée d'all-mpnet-base-v2
+TOKEN_BATCH = 4096       # textes par appel encode_batch
+
+
+@lru_cache(maxsize=1)
+def get_tokenizer():
+    from transformers import AutoTokenizer
+
+    return AutoTokenizer.from_pretrained(MODEL_NAME, use_fast=True)
+
+
+def special_tokens_count():
+    """Tokens spéciaux ajoutés à une séquence (<s> … </s>)."""
+    return get_tokenizer().num_special_tokens_to_add()
+
+
+def encode_texts(texts, batch_size=TOKEN_BATCH):
+    """
+    Encodings du tokenizer Rust (offsets, word_ids), sans tokens
+    spéciaux ni troncature, par lots de `batch_size` textes.
+    """
+    backend = get_tokenizer().backend_tokenizer
+    backend.no_truncation()
+    backend.no_padding()
+
+    texts = list(texts)
+    for i in range(0, len(texts), batch_size):
+        yield from backend.encode_batch(
+            texts[i:i + batch_size], add_special_tokens=False
+        )
+
+
+def count_tokens(texts, batch_size=TOKEN_BATCH):
+    """
+    Nombre de tokens de chaque texte (tokens spéciaux inclus,
+    comme len(tokenizer.encode(text))).
+    """
+    n_special = special_tokens_count()
+    return [
+        len(encoding) + n_special
+        for encoding in encode_texts(texts, batch_size)
+    ]
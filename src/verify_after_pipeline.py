@@ -1,21 +1,12 @@
 # verify_after_pipeline.py
-from transformers import AutoTokenizer
 from load_documents import load_and_prepare
-
-tokenizer = AutoTokenizer.from_pretrained(
-    "sentence-transformers/all-mpnet-base-v2"
-)
+from tokens import count_tokens
 
 docs = load_and_prepare()
 
-over = 0
-max_tok = 0
-
-for doc in docs:
-    tok = len(tokenizer.encode(doc.page_content))
-    if tok > 384:
-        over += 1
-    max_tok = max(max_tok, tok)
+counts = count_tokens(doc.page_content for doc in docs)
+over = sum(1 for tok in counts if tok > 384)
+max_tok = max(counts, default=0)
 
 print(f"\nAPRÈS PIPELINE COMPLET :")
 print(f"  Total documents  : {len(docs)}")
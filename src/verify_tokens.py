@@ -1,32 +1,45 @@
 # verify_split.py
-from transformers import AutoTokenizer
+import itertools
 import json
-import re
+from pathlib import Path
 
-tokenizer = AutoTokenizer.from_pretrained(
-    "sentence-transformers/all-mpnet-base-v2"
+from corpus import (
+    extract_content, has_corpus, iter_corpus_records, open_text,
+    resolve_jsonl,
 )
 
-def extract_content(text):
-    match = re.search(r'CONTENT:\s*(.+)$', text, re.DOTALL)
-    if match:
-        return match.group(1).strip()
-    return text.strip()
+from tokens import TOKEN_BATCH, count_tokens
+
+JSONL_PATH = Path('darkgram_cti_final.jsonl')
+
+def iter_contents():
+    """(contenu, métadonnées) : Parquet si dispo, sinon JSONL (.zst/.gz)."""
+    if has_corpus(JSONL_PATH):
+        columns = ['content', 'doc_type', 'channel_name', 'category']
+        for rec in iter_corpus_records(JSONL_PATH, columns=columns):
+            yield rec['content'], rec['metadata']
+        return
+    with open_text(resolve_jsonl(JSONL_PATH)) as f:
+        for line in f:
+            obj = json.loads(line)
+            yield extract_content(obj['text']), obj['metadata']
 
 # Trouve les 5 plus longs pour voir ce qu'ils contiennent
 long_docs = []
 
-with open('darkgram_cti_final.jsonl', 'r', encoding='utf-8') as f:
-    for line in f:
-        obj = json.loads(line)
-        content = extract_content(obj['text'])
-        tok = len(tokenizer.encode(content))
+contents = iter_contents()
+while True:
+    batch = list(itertools.islice(contents, TOKEN_BATCH))
+    if not batch:
+        break
+    counts = count_tokens(content for content, _ in batch)
+    for (content, meta), tok in zip(batch, counts):
         if tok > 384:
             long_docs.append({
                 'tokens': tok,
-                'type': obj['metadata'].get('doc_type', ''),
-                'channel': obj['metadata'].get('channel_name', ''),
-                'category': obj['metadata'].get('category', ''),
+                'type': meta.get('doc_type', ''),
+                'channel': meta.get('channel_name', ''),
+                'category': meta.get('category', ''),
                 'preview': content[:150] + '...',
             })
 